@@ -2,6 +2,8 @@
 
 from django.contrib import admin
 from .models import Category, Tag, Post, Comment
+from .utils import recount_comments
+from .utils.cache import invalidate_post_responses
 
 
 @admin.register(Category)
@@ -37,5 +39,9 @@ class CommentAdmin(admin.ModelAdmin):
 
     def approve_comments(self, request, queryset):
         """Approve selected comments."""
+        post_ids = set(queryset.values_list('post_id', flat=True))
         queryset.update(is_approved=True)
+        recount_comments(post_ids)
+        # update() skips the comment signals, so drop the cached details here
+        invalidate_post_responses(*Post.objects.filter(pk__in=post_ids).values_list('slug', flat=True))
     approve_comments.short_description = 'Approve selected comments'
@@ -8,3 +8,8 @@ class BlogConfig(AppConfig):
     
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        from blog import signals  # noqa: F401
+        # Register the renditions the models' image spec fields refer to
+        from blog.utils import image_processors  # noqa: F401
@@ -0,0 +1,20 @@
+"""Recompute stored excerpt, word count and read time for posts."""
+
+from django.core.management.base import BaseCommand
+from blog.utils import backfill_content_metrics
+
+
+class Command(BaseCommand):
+    """Backfill precomputed post content metrics."""
+
+    help = 'Recompute excerpt, word count and read time for every post.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of posts to update per batch.'
+        )
+
+    def handle(self, *args, **options):
+        processed = backfill_content_metrics(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated content metrics on {processed} post(s).'))
@@ -0,0 +1,70 @@
+"""Regenerate featured image and avatar renditions."""
+
+import os
+from django.core.management.base import BaseCommand
+from blog.utils import backfill_renditions
+from blog.utils.renditions import RENDITION_SPECS
+
+
+class Command(BaseCommand):
+    """Regenerate renditions across a process pool, resuming from a checkpoint."""
+
+    help = 'Regenerate image renditions for all featured images and avatars.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--spec', action='append', choices=RENDITION_SPECS, dest='specs',
+            help='Rendition to regenerate (repeatable). Defaults to all.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Worker processes. Defaults to the number of CPU cores.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of source images per checkpointed batch.'
+        )
+        parser.add_argument(
+            '--checkpoint', default='.rendition_backfill.json',
+            help='Checkpoint file used to resume an interrupted run.'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore an existing checkpoint and start from the beginning.'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenerate renditions that already exist in storage.'
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = options['checkpoint']
+        if options['restart']:
+            self.remove_checkpoint(checkpoint)
+        stats = backfill_renditions(
+            specs=options['specs'],
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            checkpoint=checkpoint,
+            force=options['force'],
+            progress=self.report,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {stats['images']} image(s), generated {stats['generated']} of "
+            f"{stats['renditions']} rendition(s) in {stats['seconds']:.1f}s "
+            f"({self.throughput(stats):.1f} images/s)."
+        ))
+        if stats['missing']:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {stats['missing']} rendition(s) whose source file is missing."
+            ))
+
+    def report(self, stats):
+        self.stdout.write(f"{stats['images']} image(s) done, {self.throughput(stats):.1f} images/s")
+
+    def throughput(self, stats):
+        return stats['images'] / stats['seconds'] if stats['seconds'] else 0.0
+
+    def remove_checkpoint(self, checkpoint):
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
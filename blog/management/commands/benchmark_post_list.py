@@ -0,0 +1,56 @@
+"""Compare bytes read and latency of full and lean post list querysets."""
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from blog.models import Post, Comment
+from blog.serializers import PostListSerializer
+
+
+def fetch_bytes(queryset):
+    """Run a queryset's SQL directly and count the bytes of the returned values."""
+    sql, params = queryset.query.sql_with_params()
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for row in cursor.fetchall():
+            for value in row:
+                if value is not None:
+                    total += len(value) if isinstance(value, (str, bytes)) else len(str(value))
+    return total
+
+
+class Command(BaseCommand):
+    """Benchmark one page of posts loaded with and without the lean list queryset."""
+
+    help = 'Report bytes read from the database and latency per page for full vs lean post lists.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=10, help='Posts per page.')
+        parser.add_argument('--iterations', type=int, default=50, help='Timed runs per variant.')
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        iterations = options['iterations']
+        variants = {
+            'full': lambda: Post.objects.select_related('author', 'category').prefetch_related('tags', 'comments'),
+            'lean': lambda: Post.objects.for_list(),
+        }
+
+        for name, build in variants.items():
+            page = build().filter(status='published').order_by('-created_at')[:page_size]
+            post_ids = list(page.values_list('pk', flat=True))
+            read = fetch_bytes(page)
+            if name == 'full':
+                read += fetch_bytes(Comment.objects.filter(post_id__in=post_ids))
+
+            start = time.perf_counter()
+            for _ in range(iterations):
+                posts = list(build().filter(status='published').order_by('-created_at')[:page_size])
+                PostListSerializer(posts, many=True).data
+            latency = (time.perf_counter() - start) / iterations * 1000
+
+            self.stdout.write(
+                f'{name:>5}: {read / 1024:.1f} KiB read, {latency:.2f} ms per page '
+                f'({len(post_ids)} posts, {iterations} runs)'
+            )
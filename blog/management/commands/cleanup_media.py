@@ -0,0 +1,33 @@
+"""Delete uploaded images that no post or profile refers to, and stale upload sessions."""
+
+from django.core.management.base import BaseCommand
+from blog.utils import cleanup_stored_files, expire_uploads, recount_stored_files
+
+
+class Command(BaseCommand):
+    """Remove unreferenced stored images together with their renditions."""
+
+    help = 'Delete stored images without references, and their renditions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-period', type=int, default=3600,
+            help='Seconds a file must have been unreferenced before it is deleted.'
+        )
+        parser.add_argument(
+            '--recount', action='store_true',
+            help='Recompute reference counts from posts and profiles first.'
+        )
+        parser.add_argument(
+            '--upload-max-age', type=int, default=86400,
+            help='Seconds after which an idle chunked upload session is discarded.'
+        )
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            updated = recount_stored_files()
+            self.stdout.write(f'Recounted references of {updated} stored file(s).')
+        expired = expire_uploads(max_age=options['upload_max_age'])
+        self.stdout.write(f'Discarded {expired} stale upload session(s).')
+        files, freed = cleanup_stored_files(grace_period=options['grace_period'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {files} file(s), freed {freed / 1024:.1f} KiB.'))
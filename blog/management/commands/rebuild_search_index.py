@@ -0,0 +1,25 @@
+"""Rebuild the full-text search index for posts."""
+
+from django.core.management.base import BaseCommand
+from blog.utils import rebuild_search_index, search_index_available
+
+
+class Command(BaseCommand):
+    """Repopulate the FTS5 post index from the Post table."""
+
+    help = 'Rebuild the full-text search index over post titles, content and tags.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of posts to index per batch.'
+        )
+
+    def handle(self, *args, **options):
+        if not search_index_available():
+            self.stdout.write(self.style.WARNING(
+                'Search index is not available on this database; search uses the fallback filter.'
+            ))
+            return
+        indexed = rebuild_search_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} post(s).'))
@@ -0,0 +1,14 @@
+"""Rebuild the blog statistics rollups from the Post table."""
+
+from django.core.management.base import BaseCommand
+from blog.utils import reconcile_statistics
+
+
+class Command(BaseCommand):
+    """Full reconcile of the incrementally maintained statistics rollups."""
+
+    help = 'Recompute site, category and author statistics rollups from published posts.'
+
+    def handle(self, *args, **options):
+        written = reconcile_statistics()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {written} statistics rollup(s).'))
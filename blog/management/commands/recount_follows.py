@@ -0,0 +1,20 @@
+"""Recompute denormalized follower and following counters."""
+
+from django.core.management.base import BaseCommand
+from blog.utils import recount_follows
+
+
+class Command(BaseCommand):
+    """Rebuild follower/following counters on profiles from the Follow table."""
+
+    help = 'Recompute profile follower and following counters from the Follow table to fix drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of profiles to recount per grouped query.'
+        )
+
+    def handle(self, *args, **options):
+        fixed = recount_follows(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Corrected follow counters on {fixed} profile(s).'))
@@ -0,0 +1,20 @@
+"""Recompute denormalized post reaction counters."""
+
+from django.core.management.base import BaseCommand
+from blog.utils import recount_reactions
+
+
+class Command(BaseCommand):
+    """Rebuild like/love/bookmark counters on posts from the Reaction table."""
+
+    help = 'Recompute post reaction counters from the Reaction table to fix drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of posts to recount per grouped query.'
+        )
+
+    def handle(self, *args, **options):
+        fixed = recount_reactions(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Corrected reaction counters on {fixed} post(s).'))
@@ -0,0 +1,34 @@
+"""Report bytes saved by rendition encoding and format negotiation."""
+
+from django.core.management.base import BaseCommand
+from blog.utils.renditions import RENDITION_SPECS, measure_rendition_savings
+
+
+class Command(BaseCommand):
+    """Encode sample renditions and compare their sizes to the untuned encoding."""
+
+    help = 'Report bytes per rendition spec for the untuned encoding and each delivery format.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--spec', action='append', choices=RENDITION_SPECS, dest='specs',
+            help='Rendition to measure (repeatable). Defaults to all.'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Most recent source images to sample per source field.'
+        )
+
+    def handle(self, *args, **options):
+        report = measure_rendition_savings(specs=options['specs'], limit=options['limit'])
+        for spec, sizes in report.items():
+            if not sizes['images']:
+                self.stdout.write(f'{spec}: no source images')
+                continue
+            baseline = sizes['baseline']
+            formats = ', '.join(
+                f'{image_format} {size / 1024:.1f} KiB ({1 - size / baseline:.0%} saved)'
+                for image_format, size in sizes.items() if image_format not in ('images', 'baseline')
+            )
+            self.stdout.write(f"{spec} ({sizes['images']} images): baseline {baseline / 1024:.1f} KiB; {formats}")
+        self.stdout.write(self.style.SUCCESS(f'Measured {len(report)} rendition spec(s).'))
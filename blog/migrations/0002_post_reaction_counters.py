@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:33
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_reaction_counters(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Reaction = apps.get_model('blog', 'Reaction')
+    counts = Reaction.objects.values('post_id', 'reaction_type').annotate(count=Count('id')).order_by()
+    for row in counts:
+        Post.objects.filter(pk=row['post_id']).update(**{f"{row['reaction_type']}_count": row['count']})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='bookmark_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='love_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_reaction_counters, migrations.RunPython.noop),
+    ]
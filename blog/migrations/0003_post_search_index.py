@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        if 'ENABLE_FTS5' not in {row[0] for row in cursor.fetchall()}:
+            return
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS blog_post_fts "
+            "USING fts5(title, content, tags, tokenize='porter unicode61')"
+        )
+        cursor.execute(
+            "INSERT INTO blog_post_fts (rowid, title, content, tags) "
+            "SELECT p.id, p.title, p.content, COALESCE(("
+            "  SELECT group_concat(t.name, ' ') FROM blog_post_tags pt "
+            "  JOIN blog_tag t ON t.id = pt.tag_id WHERE pt.post_id = p.id"
+            "), '') FROM blog_post p"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS blog_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_post_reaction_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
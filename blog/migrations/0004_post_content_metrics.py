@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:41
+
+import math
+
+from django.db import migrations, models
+
+
+def populate_content_metrics(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    batch = []
+    for post in Post.objects.only('pk', 'content').iterator(chunk_size=500):
+        content = post.content or ''
+        post.excerpt = content[:150] + '...' if len(content) > 150 else content
+        post.word_count = len(content.split())
+        post.read_time = max(1, math.ceil(post.word_count / 200))
+        batch.append(post)
+        if len(batch) >= 500:
+            Post.objects.bulk_update(batch, ['excerpt', 'word_count', 'read_time'])
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, ['excerpt', 'word_count', 'read_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=153),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='read_time',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_content_metrics, migrations.RunPython.noop),
+    ]
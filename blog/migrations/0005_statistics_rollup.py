@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_post_content_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatisticsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('site', 'Site'), ('category', 'Category'), ('author', 'Author')], max_length=10)),
+                ('scope_id', models.PositiveBigIntegerField(default=0)),
+                ('total_posts', models.BigIntegerField(default=0)),
+                ('total_views', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('most_viewed_post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='blog.post')),
+            ],
+            options={
+                'ordering': ['scope', 'scope_id'],
+                'unique_together': {('scope', 'scope_id')},
+            },
+        ),
+    ]
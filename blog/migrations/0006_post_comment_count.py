@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:47
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_comment_counts(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    counts = Comment.objects.filter(is_approved=True).values('post_id').annotate(count=Count('id')).order_by()
+    for row in counts:
+        Post.objects.filter(pk=row['post_id']).update(comment_count=row['count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_statistics_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, help_text='Approved comments'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'is_approved', 'created_at'], name='blog_comment_approved_idx'),
+        ),
+        migrations.RunPython(populate_comment_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:12
+
+import blog.storage
+from collections import Counter
+from django.db import migrations, models
+
+
+def track_existing_files(apps, schema_editor):
+    StoredFile = apps.get_model('blog', 'StoredFile')
+    references = Counter()
+    for model, field in [('Post', 'featured_image'), ('UserProfile', 'avatar')]:
+        names = apps.get_model('blog', model).objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        references.update(names.values_list(field, flat=True))
+    # Digests of files stored before deduplication are filled in on cleanup
+    StoredFile.objects.bulk_create([
+        StoredFile(name=name, ref_count=count) for name, count in references.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_post_comment_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='featured_image',
+            field=models.ImageField(blank=True, null=True, storage=blog.storage.DeduplicatingStorage(), upload_to='posts/'),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=blog.storage.DeduplicatingStorage(), upload_to='avatars/'),
+        ),
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('digest', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('ref_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ref_count', 'updated_at'], name='blog_storedfile_orphan_idx')],
+            },
+        ),
+        migrations.RunPython(track_existing_files, migrations.RunPython.noop),
+    ]
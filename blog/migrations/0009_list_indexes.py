@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_image_upload'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['following', 'created_at'], name='blog_follow_following_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['follower', 'created_at'], name='blog_follow_follower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'created_at'], name='blog_post_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='readinglist',
+            index=models.Index(fields=['user', 'added_at'], name='blog_readinglist_user_idx'),
+        ),
+    ]
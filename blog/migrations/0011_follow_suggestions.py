@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0010_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowSuggestion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='follow_suggestion', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('suggestions', models.JSONField(default=list, help_text='[[user id, score], ...]')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_follow_suggestions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='interactions_changed_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Last reaction or reading list change, for incremental recommendation refreshes', null=True),
+        ),
+        migrations.CreateModel(
+            name='RelatedPosts',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('also_liked', 'Readers also liked')], max_length=10)),
+                ('neighbours', models.JSONField(default=list, help_text='[[post id, score], ...]')),
+                ('computed_at', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_posts', to='blog.post')),
+            ],
+            options={
+                'unique_together': {('post', 'kind')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_related_posts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostVector',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='vector', serialize=False, to='blog.post')),
+                ('terms', models.BinaryField()),
+                ('weights', models.BinaryField()),
+                ('tags', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='relatedposts',
+            name='kind',
+            field=models.CharField(choices=[('also_liked', 'Readers also liked'), ('content', 'Similar content')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_post_vectors'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='pulled',
+            field=models.BooleanField(default=False, help_text='Published while its author was over the fan-out limit, so merged into feeds at read time'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('pulled', True)), fields=['author', 'created_at'], name='blog_post_pulled_idx'),
+        ),
+    ]
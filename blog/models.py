@@ -1,12 +1,13 @@
 """Blog models for the API."""
 
+import math
+import uuid
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from imagekit.models import ImageSpecField
-from imagekit.processors import ResizeToFill
+from blog.storage import image_storage
 
 
 class Category(models.Model):
@@ -47,6 +48,36 @@ class Tag(models.Model):
         return self.name
 
 
+class PostQuerySet(models.QuerySet):
+    """Post queryset keeping content metrics current in bulk writes."""
+
+    LIST_FIELDS = [
+        'id', 'title', 'slug', 'excerpt', 'featured_image', 'created_at', 'views_count',
+        'read_time', 'like_count', 'love_count', 'bookmark_count',
+        'author', 'author__username',
+        'category', 'category__name', 'category__slug', 'category__description',
+    ]
+
+    def for_list(self):
+        """Load only the columns list serializers need, without the full content."""
+        return self.select_related('author', 'category').prefetch_related('tags').only(*self.LIST_FIELDS)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.update_content_metrics()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        fields = list(fields)
+        if 'content' in fields:
+            objs = list(objs)
+            for obj in objs:
+                obj.update_content_metrics()
+            fields += [field for field in Post.CONTENT_METRIC_FIELDS if field not in fields]
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
 class Post(models.Model):
     """Blog post model."""
     
@@ -54,56 +85,85 @@ class Post(models.Model):
         ('draft', 'Draft'),
         ('published', 'Published'),
     ]
+    EXCERPT_LENGTH = 150
+    WORDS_PER_MINUTE = 200
+    CONTENT_METRIC_FIELDS = ['excerpt', 'word_count', 'read_time']
     
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True, blank=True)
     content = models.TextField()
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH + 3, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    read_time = models.PositiveIntegerField(default=1, editable=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='posts')
     tags = models.ManyToManyField(Tag, blank=True, related_name='posts')
     featured_image = models.ImageField(
         upload_to='posts/', 
+        storage=image_storage,
         blank=True, 
         null=True
     )
-    featured_image_large = ImageSpecField(
-        source='featured_image',
-        processors=[ResizeToFill(800, 400)],
-        format='JPEG',
-        options={'quality': 85}
-    )
-    featured_image_medium = ImageSpecField(
-        source='featured_image',
-        processors=[ResizeToFill(400, 200)],
-        format='JPEG',
-        options={'quality': 80}
-    )
-    featured_image_small = ImageSpecField(
-        source='featured_image',
-        processors=[ResizeToFill(200, 100)],
-        format='JPEG',
-        options={'quality': 75}
-    )
-    featured_image_webp = ImageSpecField(
-        source='featured_image',
-        processors=[ResizeToFill(800, 400)],
-        format='WEBP',
-        options={'quality': 80}
-    )
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     views_count = models.PositiveIntegerField(default=0)
     is_featured = models.BooleanField(default=False)
+    like_count = models.PositiveIntegerField(default=0)
+    love_count = models.PositiveIntegerField(default=0)
+    bookmark_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0, help_text='Approved comments')
+    interactions_changed_at = models.DateTimeField(
+        null=True, blank=True, db_index=True,
+        help_text='Last reaction or reading list change, for incremental recommendation refreshes'
+    )
+    pulled = models.BooleanField(
+        default=False,
+        help_text='Published while its author was over the fan-out limit, so merged into feeds at read time'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pages of an author's posts
+            models.Index(fields=['author', 'created_at'], name='blog_post_author_created_idx'),
+            # Posts merged into feeds at read time, per followed author
+            models.Index(
+                fields=['author', 'created_at'], condition=models.Q(pulled=True), name='blog_post_pulled_idx'
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.update_content_metrics()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(self.CONTENT_METRIC_FIELDS)
         super().save(*args, **kwargs)
 
+    def update_content_metrics(self):
+        """Compute excerpt, word count and read time (200 words per minute) from content."""
+        content = self.content or ''
+        if len(content) > self.EXCERPT_LENGTH:
+            self.excerpt = content[:self.EXCERPT_LENGTH] + '...'
+        else:
+            self.excerpt = content
+        self.word_count = len(content.split())
+        self.read_time = max(1, math.ceil(self.word_count / self.WORDS_PER_MINUTE))
+
+    def get_reaction_counts(self):
+        """Get non-zero reaction counts from the stored counters."""
+        counts = {}
+        for reaction_type, _ in Reaction.REACTION_CHOICES:
+            count = getattr(self, Reaction.counter_field(reaction_type))
+            if count:
+                counts[reaction_type] = count
+        return counts
+
     def __str__(self):
         return self.title
 
@@ -120,6 +180,9 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'is_approved', 'created_at'], name='blog_comment_approved_idx'),
+        ]
 
     def __str__(self):
         author_name = self.author.username if self.author else self.email
@@ -133,21 +196,10 @@ class UserProfile(models.Model):
     bio = models.TextField(max_length=500, blank=True)
     avatar = models.ImageField(
         upload_to='avatars/', 
+        storage=image_storage,
         blank=True, 
         null=True
     )
-    avatar_thumbnail = ImageSpecField(
-        source='avatar',
-        processors=[ResizeToFill(150, 150)],
-        format='JPEG',
-        options={'quality': 85}
-    )
-    avatar_small = ImageSpecField(
-        source='avatar',
-        processors=[ResizeToFill(50, 50)],
-        format='JPEG',
-        options={'quality': 80}
-    )
     website = models.URLField(blank=True)
     twitter = models.CharField(max_length=50, blank=True)
     github = models.CharField(max_length=50, blank=True)
@@ -157,9 +209,19 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Kept in step with F() updates as users follow and unfollow
+    COUNTER_FIELDS = ('follower_count', 'following_count')
+
     def __str__(self):
         return f"{self.user.username}'s profile"
 
+    def save_without_counters(self):
+        """Save the profile, leaving the follow counters as they are in the database."""
+        self.save(update_fields=[
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.name not in self.COUNTER_FIELDS
+        ])
+
 
 class Follow(models.Model):
     """User following system."""
@@ -171,6 +233,11 @@ class Follow(models.Model):
     class Meta:
         unique_together = ('follower', 'following')
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pages of a user's followers and followed users
+            models.Index(fields=['following', 'created_at'], name='blog_follow_following_idx'),
+            models.Index(fields=['follower', 'created_at'], name='blog_follow_follower_idx'),
+        ]
 
     def __str__(self):
         return f"{self.follower.username} follows {self.following.username}"
@@ -187,7 +254,7 @@ def create_user_profile(sender, instance, created, **kwargs):
 def save_user_profile(sender, instance, **kwargs):
     """Save user profile when user is saved."""
     if hasattr(instance, 'profile'):
-        instance.profile.save()
+        instance.profile.save_without_counters()
 
 
 class Reaction(models.Model):
@@ -208,6 +275,11 @@ class Reaction(models.Model):
         unique_together = ('user', 'post', 'reaction_type')
         ordering = ['-created_at']
 
+    @staticmethod
+    def counter_field(reaction_type):
+        """Get the Post counter column for a reaction type."""
+        return f'{reaction_type}_count'
+
     def __str__(self):
         return f"{self.user.username} {self.reaction_type}d {self.post.title}"
 
@@ -222,6 +294,142 @@ class ReadingList(models.Model):
     class Meta:
         unique_together = ('user', 'post')
         ordering = ['-added_at']
+        indexes = [
+            models.Index(fields=['user', 'added_at'], name='blog_readinglist_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} saved {self.post.title}"
+
+
+class TimelineEntry(models.Model):
+    """A published post in the home feed of one of its author's followers."""
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(help_text="The post's creation time, copied for feed ordering")
+
+    class Meta:
+        unique_together = ('user', 'post')
+        ordering = ['-created_at', '-post']
+        indexes = [
+            # A feed page is one range scan of this index
+            models.Index(fields=['user', 'created_at', 'post'], name='blog_timeline_page_idx'),
+            models.Index(fields=['user', 'author'], name='blog_timeline_author_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} in {self.user.username}'s feed"
+
+
+class FollowSuggestion(models.Model):
+    """Precomputed who-to-follow suggestions for one user, best first."""
+    
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='follow_suggestion')
+    suggestions = models.JSONField(default=list, help_text='[[user id, score], ...]')
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{len(self.suggestions)} suggestions for {self.user_id}"
+
+
+class RelatedPosts(models.Model):
+    """Precomputed nearest neighbours of a post, best first."""
+    
+    KIND_CHOICES = [
+        ('also_liked', 'Readers also liked'),
+        ('content', 'Similar content'),
+    ]
+    
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_posts')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    neighbours = models.JSONField(default=list, help_text='[[post id, score], ...]')
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('post', 'kind')
+
+    def __str__(self):
+        return f"{self.kind} neighbours of post {self.post_id}"
+
+
+class PostVector(models.Model):
+    """Packed term and tag vectors of a published post for content similarity.
+
+    ``terms`` and ``tags`` hold sorted unsigned 32-bit ids and ``weights``
+    the float32 term frequency weight of each term, as raw machine arrays.
+    """
+    
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='vector')
+    terms = models.BinaryField()
+    weights = models.BinaryField()
+    tags = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Vector of post {self.post_id}"
+
+
+class StatisticsRollup(models.Model):
+    """Incrementally maintained published-post totals for the site, a category or an author."""
+
+    SCOPE_CHOICES = [
+        ('site', 'Site'),
+        ('category', 'Category'),
+        ('author', 'Author'),
+    ]
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    scope_id = models.PositiveBigIntegerField(default=0)
+    total_posts = models.BigIntegerField(default=0)
+    total_views = models.BigIntegerField(default=0)
+    most_viewed_post = models.ForeignKey(Post, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('scope', 'scope_id')
+        ordering = ['scope', 'scope_id']
+
+    def __str__(self):
+        return f"{self.scope} {self.scope_id} statistics"
+
+
+class StoredFile(models.Model):
+    """An uploaded image file and the number of model fields referring to it."""
+
+    name = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count', 'updated_at'], name='blog_storedfile_orphan_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
+
+
+class ImageUpload(models.Model):
+    """A resumable, chunked image upload and, once complete, the stored file it produced."""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='image_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    stored_name = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.user.username} saved {self.post.title}"
\ No newline at end of file
+        return f"{self.filename} ({self.offset}/{self.size} bytes)"
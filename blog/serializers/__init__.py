@@ -6,6 +6,7 @@ from .comment import CommentSerializer
 from .post import PostListSerializer, PostDetailSerializer, PostCreateUpdateSerializer
 from .user import UserSerializer, UserProfileSerializer, FollowSerializer
 from .reaction import ReactionSerializer, ReadingListSerializer
+from .upload import ImageUploadSerializer
 
 __all__ = [
     'CategorySerializer',
@@ -19,4 +20,5 @@ __all__ = [
     'FollowSerializer',
     'ReactionSerializer',
     'ReadingListSerializer',
+    'ImageUploadSerializer',
 ]
\ No newline at end of file
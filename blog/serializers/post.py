@@ -1,72 +1,85 @@
 """Post serializers."""
 
-import math
+from django.db import transaction
+from django.urls import reverse
 from rest_framework import serializers
-from blog.models import Post
+from rest_framework.utils.urls import replace_query_param
+from blog.models import Post, Comment, ImageUpload
+from blog.utils.image_processors import RENDITION_SOURCES
+from blog.utils.pagination import build_cursor_url
+from blog.utils.renditions import rendition_url
+from blog.utils.validators import validate_featured_image
+from blog.utils.reactions import prime_reaction_cache, get_cached_reactions
+from blog.utils.recommendations import get_related_posts
 from .category import CategorySerializer
 from .tag import TagSerializer
 from .comment import CommentSerializer
 
 
+class PostListBatchSerializer(serializers.ListSerializer):
+    """List serializer that batch-loads reaction data for every post on the page."""
+    
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        prime_reaction_cache(self.context, posts)
+        return super().to_representation(posts)
+
+
 class PostListSerializer(serializers.ModelSerializer):
     """Minimal version for post list: title, slug, excerpt, author, category, tags, featured_image, created_at, view_count."""
     
     author_name = serializers.SerializerMethodField()
     category = CategorySerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
-    excerpt = serializers.SerializerMethodField()
-    read_time = serializers.SerializerMethodField()
     reaction_counts = serializers.SerializerMethodField()
     user_reactions = serializers.SerializerMethodField()
     featured_image_urls = serializers.SerializerMethodField()
+    search_snippet = serializers.SerializerMethodField()
     
     class Meta:
         model = Post
         fields = [
             'id', 'title', 'slug', 'excerpt', 'author_name', 'category', 
             'tags', 'featured_image', 'featured_image_urls', 'created_at', 
-            'views_count', 'read_time', 'reaction_counts', 'user_reactions'
+            'views_count', 'read_time', 'reaction_counts', 'user_reactions',
+            'search_snippet'
         ]
+        read_only_fields = ['excerpt', 'read_time']
+        list_serializer_class = PostListBatchSerializer
     
     def get_author_name(self, obj):
         """Get author username."""
         return obj.author.username
     
-    def get_excerpt(self, obj):
-        """Get first 150 characters of content."""
-        return obj.content[:150] + '...' if len(obj.content) > 150 else obj.content
-    
-    def get_read_time(self, obj):
-        """Estimate read time based on word count (200 words per minute)."""
-        word_count = len(obj.content.split())
-        return max(1, math.ceil(word_count / 200))
-    
     def get_reaction_counts(self, obj):
-        """Get reaction counts for the post."""
-        from django.db.models import Count
-        reactions = obj.reactions.values('reaction_type').annotate(count=Count('reaction_type'))
-        return {reaction['reaction_type']: reaction['count'] for reaction in reactions}
+        """Get reaction counts from the post's stored counters."""
+        return obj.get_reaction_counts()
     
     def get_user_reactions(self, obj):
         """Get current user's reactions to this post."""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            user_reactions = obj.reactions.filter(user=request.user).values_list('reaction_type', flat=True)
-            return list(user_reactions)
-        return []
+        return get_cached_reactions(self.context, obj)
     
     def get_featured_image_urls(self, obj):
-        """Get optimized featured image URLs."""
+        """Get featured image rendition URLs, each serving AVIF, WebP or JPEG as the client accepts.
+
+        ``webp`` is kept for clients of the former fixed WebP rendition and
+        points at the large one, which serves WebP to them.
+        """
         if obj.featured_image:
             request = self.context.get('request')
             if request:
-                return {
-                    'large': request.build_absolute_uri(obj.featured_image_large.url),
-                    'medium': request.build_absolute_uri(obj.featured_image_medium.url),
-                    'small': request.build_absolute_uri(obj.featured_image_small.url),
-                    'webp': request.build_absolute_uri(obj.featured_image_webp.url),
+                _, specs = RENDITION_SOURCES['featured_image']
+                urls = {
+                    spec[len('featured_image_'):]: rendition_url(request, obj.featured_image, spec)
+                    for spec in specs
                 }
+                urls['webp'] = urls['large']
+                return urls
         return None
+    
+    def get_search_snippet(self, obj):
+        """Get highlighted search match, present only on full-text search results."""
+        return getattr(obj, 'search_snippet', None)
 
 
 class PostDetailSerializer(serializers.ModelSerializer):
@@ -75,41 +88,100 @@ class PostDetailSerializer(serializers.ModelSerializer):
     author_name = serializers.SerializerMethodField()
     category = CategorySerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
-    comment_count = serializers.SerializerMethodField()
-    read_time = serializers.SerializerMethodField()
+    comments = serializers.SerializerMethodField()
+    comments_next = serializers.SerializerMethodField()
+    also_liked = serializers.SerializerMethodField()
+    related = serializers.SerializerMethodField()
+    
+    embedded_comment_limit = 10
     
     class Meta:
         model = Post
         fields = [
             'id', 'title', 'slug', 'content', 'author_name', 'category',
             'tags', 'featured_image', 'status', 'created_at', 'updated_at',
-            'views_count', 'comments', 'comment_count', 'read_time'
+            'views_count', 'comments', 'comments_next', 'comment_count', 'read_time', 'also_liked',
+            'related'
         ]
+        read_only_fields = ['comment_count', 'read_time']
     
     def get_author_name(self, obj):
         """Get author username."""
         return obj.author.username
     
-    def get_comment_count(self, obj):
-        """Get approved comment count."""
-        return obj.comments.filter(is_approved=True).count()
+    def get_embedded_comments(self, obj):
+        """Load the first approved comments plus one to detect a next page."""
+        cache = self.context.setdefault('embedded_comments', {})
+        if obj.pk not in cache:
+            cache[obj.pk] = list(
+                Comment.objects.filter(post=obj, is_approved=True).select_related('author')
+                .order_by('created_at', 'pk')[:self.embedded_comment_limit + 1]
+            )
+        return cache[obj.pk]
+    
+    def get_comments(self, obj):
+        """Get the first approved comments of the post."""
+        comments = self.get_embedded_comments(obj)[:self.embedded_comment_limit]
+        return CommentSerializer(comments, many=True, context=self.context).data
+    
+    def get_comments_next(self, obj):
+        """Get the cursor URL of the next page of approved comments, if any."""
+        comments = self.get_embedded_comments(obj)
+        if len(comments) <= self.embedded_comment_limit:
+            return None
+        url = replace_query_param(reverse('comment-list'), 'post', obj.slug)
+        request = self.context.get('request')
+        if request:
+            url = request.build_absolute_uri(url)
+        return build_cursor_url(url, 'created_at', comments[self.embedded_comment_limit - 1])
+    
+    def get_also_liked(self, obj):
+        """Get the precomputed posts most often read by this post's readers."""
+        return [
+            {'id': post.id, 'title': post.title, 'slug': post.slug, 'score': score}
+            for post, score in get_related_posts(obj, 'also_liked')
+        ]
     
-    def get_read_time(self, obj):
-        """Estimate read time based on word count (200 words per minute)."""
-        word_count = len(obj.content.split())
-        return max(1, math.ceil(word_count / 200))
+    def get_related(self, obj):
+        """Get the precomputed posts with the most similar tags and text."""
+        return [
+            {'id': post.id, 'title': post.title, 'slug': post.slug, 'score': score}
+            for post, score in get_related_posts(obj, 'content')
+        ]
 
 
 class PostCreateUpdateSerializer(serializers.ModelSerializer):
     """Used when creating/editing posts, includes validation."""
     
+    # A plain file field: the validator checks the name's extension and the image header
+    featured_image = serializers.FileField(required=False, allow_null=True, validators=[validate_featured_image])
+    # Or the id of a completed chunked upload, already validated and stored
+    featured_image_upload = serializers.PrimaryKeyRelatedField(
+        queryset=ImageUpload.objects.filter(status='complete'), required=False, write_only=True
+    )
+    
     class Meta:
         model = Post
         fields = [
-            'title', 'content', 'category', 'tags', 'featured_image', 'status'
+            'title', 'content', 'category', 'tags', 'featured_image', 'featured_image_upload', 'status'
         ]
     
+    def validate_featured_image_upload(self, value):
+        """Only the uploader can attach an upload."""
+        request = self.context.get('request')
+        if request is None or value.user_id != request.user.pk:
+            raise serializers.ValidationError("Invalid upload.")
+        return value
+    
+    def validate(self, attrs):
+        """Attach a chunked upload's stored file as the featured image."""
+        upload = attrs.pop('featured_image_upload', None)
+        if upload is not None:
+            if 'featured_image' in attrs:
+                raise serializers.ValidationError("Send either featured_image or featured_image_upload, not both.")
+            attrs['featured_image'] = upload.stored_name
+        return attrs
+    
     def validate_title(self, value):
         """Validate title is not empty and reasonable length."""
         if len(value.strip()) < 5:
@@ -120,4 +192,9 @@ class PostCreateUpdateSerializer(serializers.ModelSerializer):
         """Validate content is not empty."""
         if len(value.strip()) < 10:
             raise serializers.ValidationError("Content must be at least 10 characters long.")
-        return value.strip()
\ No newline at end of file
+        return value.strip()
+    
+    def save(self, **kwargs):
+        """Save the post and its tags in one transaction, so post-commit work sees both and runs once."""
+        with transaction.atomic():
+            return super().save(**kwargs)
\ No newline at end of file
@@ -2,6 +2,7 @@
 
 from rest_framework import serializers
 from blog.models import Reaction, ReadingList
+from blog.utils.reactions import prime_reaction_cache
 from .post import PostListSerializer
 
 
@@ -14,6 +15,15 @@ class ReactionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+class ReadingListBatchSerializer(serializers.ListSerializer):
+    """List serializer that batch-loads reaction data for the saved posts."""
+    
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        prime_reaction_cache(self.context, [item.post for item in items])
+        return super().to_representation(items)
+
+
 class ReadingListSerializer(serializers.ModelSerializer):
     """Reading list serializer."""
     
@@ -22,4 +32,5 @@ class ReadingListSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReadingList
         fields = ['id', 'post', 'added_at']
-        read_only_fields = ['id', 'added_at']
\ No newline at end of file
+        read_only_fields = ['id', 'added_at']
+        list_serializer_class = ReadingListBatchSerializer
\ No newline at end of file
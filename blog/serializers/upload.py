@@ -0,0 +1,29 @@
+"""Chunked image upload serializers."""
+
+from rest_framework import serializers
+from blog.models import ImageUpload
+from blog.utils.validators import validate_featured_image
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """Image upload session: declared name and size, and progress so far."""
+    
+    class Meta:
+        model = ImageUpload
+        fields = ['id', 'filename', 'size', 'offset', 'status', 'stored_name', 'created_at']
+        read_only_fields = ['id', 'offset', 'status', 'stored_name', 'created_at']
+    
+    def validate_filename(self, value):
+        """Refuse names the image validator would reject, before any bytes are sent."""
+        validate_featured_image.validate_name(value)
+        return value
+    
+    def validate_size(self, value):
+        """Refuse uploads the image validator would reject for size alone."""
+        if value < 1:
+            raise serializers.ValidationError("Size must be at least 1 byte.")
+        if value > validate_featured_image.max_size:
+            raise validate_featured_image.error(
+                'file_too_large', max_size_mb=validate_featured_image.max_size // (1024 * 1024), size=value
+            )
+        return value
@@ -3,11 +3,16 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from blog.models import UserProfile, Follow
+from blog.utils.follows import get_cached_following, prime_following_cache
+from blog.utils.renditions import rendition_url
+from blog.utils.validators import validate_avatar_image
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
     """User profile serializer."""
     
+    # A plain file field: the validator checks the name's extension and the image header
+    avatar = serializers.FileField(required=False, allow_null=True, validators=[validate_avatar_image])
     avatar_thumbnail = serializers.SerializerMethodField()
     avatar_small = serializers.SerializerMethodField()
     
@@ -18,24 +23,41 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'website', 'twitter', 'github', 'linkedin', 
             'follower_count', 'following_count'
         ]
+        read_only_fields = ['follower_count', 'following_count']
+    
+    def update(self, instance, validated_data):
+        """Update the profile without writing back its possibly stale follow counters."""
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save_without_counters()
+        return instance
     
     def get_avatar_thumbnail(self, obj):
-        """Get avatar thumbnail URL."""
+        """Get avatar thumbnail URL, in the format the client accepts."""
         if obj.avatar:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.avatar_thumbnail.url)
+                return rendition_url(request, obj.avatar, 'avatar_thumbnail')
         return None
     
     def get_avatar_small(self, obj):
-        """Get small avatar URL."""
+        """Get small avatar URL, in the format the client accepts."""
         if obj.avatar:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.avatar_small.url)
+                return rendition_url(request, obj.avatar, 'avatar_small')
         return None
 
 
+class UserBatchSerializer(serializers.ListSerializer):
+    """List serializer that checks which users on the page are followed in one query."""
+    
+    def to_representation(self, data):
+        users = list(data.all() if hasattr(data, 'all') else data)
+        prime_following_cache(self.context, users)
+        return super().to_representation(users)
+
+
 class UserSerializer(serializers.ModelSerializer):
     """User serializer with profile data."""
     
@@ -49,16 +71,22 @@ class UserSerializer(serializers.ModelSerializer):
             'date_joined', 'profile', 'is_following'
         ]
         read_only_fields = ['id', 'date_joined']
+        list_serializer_class = UserBatchSerializer
     
     def get_is_following(self, obj):
         """Check if current user is following this user."""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Follow.objects.filter(
-                follower=request.user, 
-                following=obj
-            ).exists()
-        return False
+        return get_cached_following(self.context, obj)
+
+
+class FollowBatchSerializer(serializers.ListSerializer):
+    """List serializer that checks both sides of every follow on the page in one query."""
+    
+    def to_representation(self, data):
+        follows = list(data.all() if hasattr(data, 'all') else data)
+        prime_following_cache(
+            self.context, [user for follow in follows for user in (follow.follower, follow.following)]
+        )
+        return super().to_representation(follows)
 
 
 class FollowSerializer(serializers.ModelSerializer):
@@ -70,4 +98,5 @@ class FollowSerializer(serializers.ModelSerializer):
     class Meta:
         model = Follow
         fields = ['id', 'follower', 'following', 'created_at']
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at']
+        list_serializer_class = FollowBatchSerializer
\ No newline at end of file
@@ -0,0 +1,309 @@
+"""Signal handlers keeping derived blog data in sync with the models."""
+
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils import timezone
+from blog.models import Post, Tag, Category, Comment, ReadingList, UserProfile
+from blog.utils.analytics import apply_post_contribution, apply_view_deltas
+from blog.utils.cache import get_response_cache, invalidate_post_responses
+from blog.utils.feed import fan_out_post, remove_post as remove_post_from_feeds
+from blog.utils.media import IMAGE_FIELDS, release_file, retain_file
+from blog.utils.related import update_post_vectors
+from blog.utils.renditions import schedule_renditions
+from blog.utils.search import index_posts, remove_post
+from blog.utils.tasks import schedule, schedule_batch
+from blog.utils.view_counter import views_flushed
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw=False, **kwargs):
+    """Refresh the search index entry of a saved post."""
+    if not raw:
+        index_posts([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    """Drop a deleted post from the search index."""
+    remove_post(instance.pk)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def reindex_post_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Reindex posts whose tags were added, removed or cleared."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        index_posts([instance])
+    elif pk_set:
+        index_posts(Post.objects.filter(pk__in=pk_set).prefetch_related('tags'))
+
+
+@receiver(post_save, sender=Tag)
+def reindex_renamed_tag(sender, instance, created, raw=False, **kwargs):
+    """Reindex posts carrying a tag when the tag is renamed."""
+    if not created and not raw:
+        index_posts(instance.posts.prefetch_related('tags'))
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tagged_posts(sender, instance, **kwargs):
+    """Remember which posts carried a tag before it is deleted."""
+    instance._tagged_post_ids = list(instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def reindex_untagged_posts(sender, instance, **kwargs):
+    """Reindex posts that lost a deleted tag."""
+    post_ids = getattr(instance, '_tagged_post_ids', None)
+    if post_ids:
+        index_posts(Post.objects.filter(pk__in=post_ids).prefetch_related('tags'))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_cache(sender, instance, **kwargs):
+    """Drop cached lists and the detail response of a changed post."""
+    invalidate_post_responses(instance.slug)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_tagged_post_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop cached responses of posts whose tags changed."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_post_responses(instance.slug)
+    elif pk_set:
+        invalidate_post_responses(*Post.objects.filter(pk__in=pk_set).values_list('slug', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+def invalidate_tag_cache(sender, instance, created, **kwargs):
+    """Drop cached responses of posts showing a renamed tag."""
+    if not created:
+        invalidate_post_responses(*instance.posts.values_list('slug', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def invalidate_deleted_tag_cache(sender, instance, **kwargs):
+    """Drop cached responses of posts that lost a deleted tag."""
+    post_ids = getattr(instance, '_tagged_post_ids', None)
+    if post_ids:
+        invalidate_post_responses(*Post.objects.filter(pk__in=post_ids).values_list('slug', flat=True))
+
+
+@receiver(post_save, sender=Category)
+def invalidate_category_cache(sender, instance, created, **kwargs):
+    """Drop cached responses of posts showing a changed category."""
+    if not created:
+        invalidate_post_responses(*instance.posts.values_list('slug', flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def invalidate_deleted_category_cache(sender, instance, **kwargs):
+    """Drop cached responses of posts about to lose their category."""
+    invalidate_post_responses(*instance.posts.values_list('slug', flat=True))
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_approval(sender, instance, raw=False, **kwargs):
+    """Remember whether a saved comment was approved before."""
+    instance._was_approved = False
+    if instance.pk and not raw:
+        instance._was_approved = Comment.objects.filter(pk=instance.pk, is_approved=True).exists()
+
+
+def _approved_comment_changed(comment, delta=0):
+    """Adjust the post's approved-comment counter and drop its cached detail."""
+    if delta:
+        Post.objects.filter(pk=comment.post_id).update(comment_count=F('comment_count') + delta)
+        if Comment.post.is_cached(comment):
+            comment.post.comment_count += delta
+    slug = Post.objects.filter(pk=comment.post_id).values_list('slug', flat=True).first()
+    if slug:
+        get_response_cache().invalidate(f'post:{slug}')
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_count(sender, instance, raw=False, **kwargs):
+    """Count comments entering or leaving the approved set."""
+    if raw:
+        return
+    was_approved = getattr(instance, '_was_approved', False)
+    if instance.is_approved or was_approved:
+        _approved_comment_changed(instance, int(instance.is_approved) - int(was_approved))
+
+
+@receiver(post_delete, sender=Comment)
+def remove_comment_count(sender, instance, **kwargs):
+    """Uncount a deleted approved comment."""
+    if instance.is_approved:
+        _approved_comment_changed(instance, -1)
+
+
+STATISTICS_FIELDS = ['id', 'status', 'category_id', 'author_id', 'views_count']
+
+# Besides the status and tags, what a post's content vector is built from
+VECTOR_FIELDS = ['title', 'content']
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_statistics(sender, instance, raw=False, **kwargs):
+    """Remember the stored state of a post that statistics and its vector depend on."""
+    instance._statistics_before = None
+    if instance.pk and not raw:
+        instance._statistics_before = Post.objects.filter(pk=instance.pk).values(
+            *STATISTICS_FIELDS, *VECTOR_FIELDS
+        ).first()
+
+
+@receiver(post_save, sender=Post)
+def update_post_statistics(sender, instance, raw=False, **kwargs):
+    """Move a post in or out of the statistics rollups when it is (un)published or moved."""
+    if raw:
+        return
+    before = getattr(instance, '_statistics_before', None)
+    after = {field: getattr(instance, field) for field in STATISTICS_FIELDS}
+    if before is not None:
+        after['views_count'] = before['views_count']
+    was_published = before is not None and before['status'] == 'published'
+    is_published = after['status'] == 'published'
+    moved = before is not None and (
+        before['category_id'] != after['category_id'] or before['author_id'] != after['author_id']
+    )
+    if was_published and (not is_published or moved):
+        apply_post_contribution(before, -1)
+    if is_published and (not was_published or moved):
+        apply_post_contribution(after, 1)
+
+
+@receiver(post_save, sender=Post)
+def update_post_timelines(sender, instance, raw=False, **kwargs):
+    """Fan a newly published post out to followers' feeds, or pull an unpublished one."""
+    if raw:
+        return
+    before = getattr(instance, '_statistics_before', None)
+    was_published = before is not None and before['status'] == 'published'
+    if instance.status == 'published' and not was_published:
+        schedule(fan_out_post, instance.pk)
+    elif was_published and instance.status != 'published':
+        remove_post_from_feeds(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def update_saved_post_vector(sender, instance, raw=False, **kwargs):
+    """Refresh the content vector and related posts of a post published, unpublished or edited while published."""
+    if raw:
+        return
+    before = getattr(instance, '_statistics_before', None)
+    was_published = before is not None and before['status'] == 'published'
+    if instance.status != 'published' and not was_published:
+        return
+    if was_published and instance.status == 'published' and all(
+        before[field] == getattr(instance, field) for field in VECTOR_FIELDS
+    ):
+        return
+    schedule_batch(update_post_vectors, [instance.pk])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_tagged_post_vectors(sender, instance, action, reverse, pk_set, **kwargs):
+    """Refresh the content vectors of posts whose tags changed."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    # Adding tags a post already has, or removing ones it lacks, sends an empty pk_set
+    if action != 'post_clear' and not pk_set:
+        return
+    if not reverse:
+        if instance.status == 'published':
+            schedule_batch(update_post_vectors, [instance.pk])
+    elif pk_set:
+        schedule_batch(update_post_vectors, pk_set)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post_statistics(sender, instance, **kwargs):
+    """Remember the stored state of a post about to be deleted."""
+    instance._statistics_before = Post.objects.filter(pk=instance.pk).values(*STATISTICS_FIELDS).first()
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_statistics(sender, instance, **kwargs):
+    """Remove a deleted published post from the statistics rollups."""
+    before = getattr(instance, '_statistics_before', None)
+    if before is not None and before['status'] == 'published':
+        apply_post_contribution(before, -1)
+
+
+@receiver(post_delete, sender=Post)
+def remove_deleted_post_vector(sender, instance, **kwargs):
+    """Take a deleted published post out of other posts' related posts."""
+    before = getattr(instance, '_statistics_before', None)
+    if before is not None and before['status'] == 'published':
+        schedule_batch(update_post_vectors, [instance.pk])
+
+
+@receiver(post_delete, sender=Tag)
+def update_untagged_post_vectors(sender, instance, **kwargs):
+    """Refresh the content vectors of posts that lost a deleted tag."""
+    post_ids = getattr(instance, '_tagged_post_ids', None)
+    if post_ids:
+        schedule_batch(update_post_vectors, post_ids)
+
+
+@receiver(views_flushed)
+def add_flushed_views(sender, deltas, **kwargs):
+    """Add flushed view counts to the statistics rollups."""
+    apply_view_deltas(deltas)
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=UserProfile)
+def remember_stored_image(sender, instance, raw=False, **kwargs):
+    """Remember which stored image a post or profile referred to before saving."""
+    instance._stored_image_before = ''
+    if instance.pk and not raw:
+        instance._stored_image_before = sender.objects.filter(pk=instance.pk).values_list(
+            IMAGE_FIELDS[sender], flat=True
+        ).first() or ''
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=UserProfile)
+def count_stored_image(sender, instance, raw=False, **kwargs):
+    """Move the reference from the previous stored image to the current one."""
+    if raw:
+        return
+    before = getattr(instance, '_stored_image_before', '')
+    after = getattr(instance, IMAGE_FIELDS[sender]).name or ''
+    if before != after:
+        retain_file(after)
+        release_file(before)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=UserProfile)
+def generate_image_renditions(sender, instance, raw=False, **kwargs):
+    """Generate the renditions of a newly stored image in the background."""
+    if raw:
+        return
+    after = getattr(instance, IMAGE_FIELDS[sender]).name or ''
+    if after and after != getattr(instance, '_stored_image_before', ''):
+        schedule_renditions(IMAGE_FIELDS[sender], after)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=UserProfile)
+def release_deleted_image(sender, instance, **kwargs):
+    """Drop the reference of a deleted post or profile to its stored image."""
+    release_file(getattr(instance, IMAGE_FIELDS[sender]).name)
+
+
+@receiver(post_save, sender=ReadingList)
+@receiver(post_delete, sender=ReadingList)
+def mark_post_interactions_changed(sender, instance, raw=False, **kwargs):
+    """Flag a saved or unsaved post for the next incremental recommendation refresh."""
+    if not raw:
+        Post.objects.filter(pk=instance.post_id).update(interactions_changed_at=timezone.now())
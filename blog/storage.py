@@ -0,0 +1,73 @@
+"""Storage for uploaded images."""
+
+import hashlib
+import posixpath
+from django.apps import apps
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+from PIL import Image
+
+
+# Extension stored for each image format, whatever the client named the file
+STORED_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif'}
+
+
+def file_digest(content):
+    """Get the SHA-256 of a file, reusing the digest computed while it was uploaded."""
+    digest = getattr(content, 'sha256', None)
+    if digest is None:
+        hasher = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        content.seek(0)
+        digest = hasher.hexdigest()
+    return digest
+
+
+def image_extension(content):
+    """Get the extension of an image's format, reusing the format found while it was validated."""
+    image_format = getattr(content, 'image_format', None)
+    if image_format is None:
+        try:
+            content.seek(0)
+            with Image.open(content) as img:
+                image_format = img.format
+        except (OSError, SyntaxError, ValueError):
+            image_format = None
+        finally:
+            content.seek(0)
+    if image_format not in STORED_EXTENSIONS:
+        raise SuspiciousFileOperation(f'{getattr(content, "name", "File")} is not a supported image.')
+    return STORED_EXTENSIONS[image_format]
+
+
+@deconstructible
+class DeduplicatingStorage(FileSystemStorage):
+    """File system storage that names files by content and stores each content once.
+
+    Saving a file whose content is already stored in the same directory
+    returns the existing name without writing anything, so duplicates share
+    the original and all of its renditions. The extension comes from the
+    image's detected format, never from the client's file name. Every stored name is tracked by
+    a ``StoredFile`` row whose references are counted by the models.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        digest = file_digest(content)
+        name = posixpath.join(posixpath.split(name)[0], f'{digest[:32]}{image_extension(content)}')
+        stored_file = apps.get_model('blog', 'StoredFile')
+        # Lock and touch the row before reusing the file, so cleanup_stored_files
+        # either finishes deleting it first or sees it back in use
+        with transaction.atomic():
+            stored_file.objects.update_or_create(name=name, defaults={'digest': digest, 'size': content.size})
+            if not self.exists(name):
+                super().save(name, content, max_length=max_length)
+        return name
+
+
+image_storage = DeduplicatingStorage()
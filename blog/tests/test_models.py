@@ -1,8 +1,10 @@
 """Test cases for blog models."""
 
+from io import StringIO
 from django.test import TestCase
 from django.contrib.auth.models import User
-from blog.models import Category, Tag, Post, Comment
+from django.core.management import call_command
+from blog.models import Category, Tag, Post, Comment, Reaction
 
 
 class CategoryModelTest(TestCase):
@@ -56,6 +58,38 @@ class PostModelTest(TestCase):
         self.assertEqual(post.status, "published")
         self.assertEqual(post.views_count, 0)
         self.assertEqual(str(post), "Test Post")
+    
+    def test_content_metrics_computed_on_save(self):
+        """Test excerpt, word count and read time are stored on save."""
+        post = Post.objects.create(
+            title="Long Post",
+            content="word " * 450,
+            author=self.user
+        )
+        self.assertEqual(post.word_count, 450)
+        self.assertEqual(post.read_time, 3)
+        self.assertEqual(post.excerpt, ("word " * 30) + '...')
+        
+        post.content = "Short content"
+        post.save(update_fields=['content'])
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, "Short content")
+        self.assertEqual(post.word_count, 2)
+        self.assertEqual(post.read_time, 1)
+    
+    def test_content_metrics_in_bulk_paths(self):
+        """Test bulk_create and the backfill command keep metrics current."""
+        Post.objects.bulk_create([
+            Post(title="Bulk Post", slug="bulk-post", content="one two three", author=self.user)
+        ])
+        post = Post.objects.get(slug="bulk-post")
+        self.assertEqual(post.word_count, 3)
+        
+        Post.objects.filter(pk=post.pk).update(word_count=0, excerpt='')
+        call_command('backfill_post_metrics', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.word_count, 3)
+        self.assertEqual(post.excerpt, "one two three")
 
 
 class CommentModelTest(TestCase):
@@ -94,4 +128,35 @@ class CommentModelTest(TestCase):
             content="Anonymous comment"
         )
         self.assertEqual(comment.email, "anon@example.com")
-        self.assertIsNone(comment.author)
\ No newline at end of file
+        self.assertIsNone(comment.author)
+
+
+class ReactionCounterTest(TestCase):
+    """Test denormalized reaction counters on Post."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpass123"
+        )
+        self.post = Post.objects.create(
+            title="Test Post",
+            content="Test content",
+            author=self.user,
+            status="published"
+        )
+    
+    def test_recount_reactions_fixes_drift(self):
+        """Test recount_reactions command rebuilds counters from reactions."""
+        Reaction.objects.create(user=self.user, post=self.post, reaction_type='like')
+        Reaction.objects.create(user=self.user, post=self.post, reaction_type='bookmark')
+        Post.objects.filter(pk=self.post.pk).update(love_count=7)
+        
+        call_command('recount_reactions', stdout=StringIO())
+        
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(self.post.love_count, 0)
+        self.assertEqual(self.post.bookmark_count, 1)
+        self.assertEqual(self.post.get_reaction_counts(), {'like': 1, 'bookmark': 1})
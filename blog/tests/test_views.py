@@ -1,10 +1,39 @@
 """Test cases for blog views."""
 
-from django.test import TestCase
+import base64
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock, skipUnless
+from PIL import Image
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import DatabaseError, connection
 from django.contrib.auth.models import User
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from blog.models import Category, Tag, Post, Comment
+from blog.models import Category, Tag, Post, Comment, Follow, Reaction, ReadingList, TimelineEntry, StatisticsRollup, StoredFile, PostVector, UserProfile
+from blog.storage import image_storage
+from blog.utils import recommendations, related, suggestions, uploads
+from blog.utils import compute_also_liked, compute_follow_suggestions, compute_related_posts, recount_follows, toggle_reaction, view_counter, reconcile_statistics, get_blog_statistics
+from blog.utils.cache import FileResponseCache, get_response_cache
+from blog.utils.media import cleanup_stored_files
+from blog.utils.search import search_posts
+from blog.utils.renditions import backfill_renditions, quiet_stderr, rendition_name, wait_for_renditions
+from blog.utils.vectorize import vectorized_available
+from blog.utils.view_counter import ViewCountBuffer
 
 
 class PostViewSetTest(TestCase):
@@ -41,6 +70,8 @@ class PostViewSetTest(TestCase):
             author=self.user,
             status="draft"
         )
+        view_counter.flush()
+        self.addCleanup(view_counter.flush)
     
     def test_list_posts_anonymous(self):
         """Test listing posts as anonymous user."""
@@ -54,10 +85,51 @@ class PostViewSetTest(TestCase):
         initial_views = self.published_post.views_count
         response = self.client.get(f'/api/posts/{self.published_post.slug}/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['views_count'], initial_views + 1)
         
+        view_counter.flush()
         self.published_post.refresh_from_db()
         self.assertEqual(self.published_post.views_count, initial_views + 1)
     
+    def test_retrieve_buffers_views_until_flush(self):
+        """Test view increments are buffered and written in one batch."""
+        for _ in range(3):
+            self.client.get(f'/api/posts/{self.published_post.slug}/')
+        
+        self.published_post.refresh_from_db()
+        self.assertEqual(self.published_post.views_count, 0)
+        self.assertEqual(view_counter.pending(self.published_post.pk), 3)
+        
+        with CaptureQueriesContext(connection) as queries:
+            flushed = view_counter.flush()
+        post_updates = [query for query in queries if query['sql'].startswith('UPDATE "blog_post"')]
+        self.assertEqual(len(post_updates), 1)
+        self.assertEqual(flushed, {self.published_post.pk: 3})
+        self.published_post.refresh_from_db()
+        self.assertEqual(self.published_post.views_count, 3)
+    
+    def test_buffered_views_flushed_by_timer(self):
+        """Test views left after a burst are flushed without another view arriving."""
+        buffer = ViewCountBuffer(flush_interval=0.05, flush_threshold=100)
+        flushed = threading.Event()
+        with mock.patch.object(buffer, 'flush', side_effect=lambda: flushed.set()):
+            buffer.increment(self.published_post.pk)
+            self.assertTrue(flushed.wait(5))
+    
+    def test_failed_flush_is_logged_and_retried(self):
+        """Test a flush error does not reach the request and keeps the views buffered."""
+        buffer = ViewCountBuffer(flush_interval=60, flush_threshold=1)
+        self.addCleanup(lambda: buffer._timer and buffer._timer.cancel())
+        with mock.patch.object(Post.objects, 'filter', side_effect=DatabaseError('locked')):
+            with self.assertLogs('blog.utils.view_counter', 'ERROR'):
+                self.assertEqual(buffer.increment(self.published_post.pk), 1)
+        self.assertEqual(buffer.pending(self.published_post.pk), 1)
+        self.assertIsNotNone(buffer._timer)
+        
+        buffer.flush()
+        self.published_post.refresh_from_db()
+        self.assertEqual(self.published_post.views_count, 1)
+    
     def test_create_post_authenticated(self):
         """Test creating post as authenticated user."""
         self.client.force_authenticate(user=self.user)
@@ -104,7 +176,31 @@ class PostViewSetTest(TestCase):
         self.client.force_authenticate(user=self.user)
         response = self.client.get('/api/posts/my_posts/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)  # Both published and draft
+        self.assertEqual(response.data['count'], 2)  # Both published and draft
+    
+    def test_list_actions_skip_content_and_comments(self):
+        """Test list actions never load post content or comments."""
+        self.client.force_authenticate(user=self.user)
+        for url in ['/api/posts/', '/api/posts/my_posts/', '/api/posts/drafts/', '/api/posts/featured/']:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            sql = ' '.join(query['sql'] for query in queries)
+            self.assertNotIn('"blog_post"."content"', sql)
+            self.assertNotIn('"blog_comment"', sql)
+    
+    def test_drafts_only_own_for_non_admin(self):
+        """Test drafts shows only the user's own drafts unless admin."""
+        other_user = User.objects.create_user(username="other", password="pass")
+        Post.objects.create(title="Other Draft", content="Other content", author=other_user)
+        
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/posts/drafts/')
+        self.assertEqual([post['slug'] for post in response.data['results']], ['draft-post'])
+        
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/api/posts/drafts/')
+        self.assertEqual(response.data['count'], 2)
     
     def test_statistics_endpoint(self):
         """Test statistics custom action."""
@@ -120,11 +216,1086 @@ class PostViewSetTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
     
+    def test_search_uses_index_ranking_and_tags(self):
+        """Test full-text search matches tag names and ranks title hits first."""
+        Post.objects.create(
+            title="Gardening Notes",
+            content="A short mention of python in passing",
+            author=self.user,
+            status="published"
+        )
+        response = self.client.get('/api/posts/?search=python')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        results = response.data['results']
+        self.assertEqual([post['slug'] for post in results], ['published-post', 'gardening-notes'])
+        self.assertIn('<mark>python</mark>', results[1]['search_snippet'])
+    
+    def test_search_cursor_follows_relevance_across_pages(self):
+        """Test cursor pages of search results continue in relevance order."""
+        for i in range(12):
+            Post.objects.create(
+                title=f"Python notes {i}" if i % 2 else f"Notes {i}",
+                content="python " * (i % 3 + 1),
+                author=self.user,
+                status="published"
+            )
+        expected = list(search_posts(Post.objects.filter(status='published'), ['python']).order_by(
+            'search_rank', 'pk'
+        ).values_list('slug', flat=True))
+        
+        slugs, url = [], '/api/posts/?search=python&pagination=cursor'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            slugs += [post['slug'] for post in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(len(slugs), 13)
+        self.assertEqual(slugs, expected)
+    
+    def test_search_snippet_escapes_content(self):
+        """Test markup in post content comes back escaped, with only the matches marked."""
+        Post.objects.create(
+            title="Gardening Notes",
+            content='Tips on python <img src=x onerror="alert(1)"> and soil',
+            author=self.user,
+            status="published"
+        )
+        response = self.client.get('/api/posts/?search=soil')
+        snippet = response.data['results'][0]['search_snippet']
+        self.assertNotIn('<img', snippet)
+        self.assertIn('&lt;img src=x onerror=&quot;alert(1)&quot;&gt;', snippet)
+        self.assertIn('<mark>soil</mark>', snippet)
+    
+    def test_search_index_follows_tag_changes(self):
+        """Test removing a tag drops the post from tag searches."""
+        self.published_post.tags.remove(self.tag)
+        response = self.client.get('/api/posts/?search=python')
+        self.assertEqual(len(response.data['results']), 0)
+    
     def test_filter_by_category(self):
         """Test filtering posts by category."""
         response = self.client.get(f'/api/posts/?category={self.category.slug}')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
+    
+    def test_list_reactions_batch_loaded(self):
+        """Test list reaction data uses a constant number of queries."""
+        for i in range(8):
+            post = Post.objects.create(
+                title=f"Extra Post {i}",
+                content="Extra content",
+                author=self.user,
+                status="published"
+            )
+            toggle_reaction(self.user, post, 'like')
+        toggle_reaction(self.admin, self.published_post, 'love')
+        toggle_reaction(self.user, self.published_post, 'love')
+        
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/posts/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        results = {post['slug']: post for post in response.data['results']}
+        self.assertEqual(results['published-post']['reaction_counts'], {'love': 2})
+        self.assertEqual(results['published-post']['user_reactions'], ['love'])
+        self.assertEqual(results['extra-post-0']['reaction_counts'], {'like': 1})
+
+
+class CursorPaginationTest(TestCase):
+    """Test opt-in keyset cursor pagination."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpass123"
+        )
+        for i in range(25):
+            Post.objects.create(
+                title=f"Post Number {i}",
+                content="Some content",
+                author=self.user,
+                status="published",
+                views_count=i % 3
+            )
+    
+    def walk(self, url):
+        """Follow next links from url and return every page's results."""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            pages.append(response.data['results'])
+            url = response.data['next']
+        return pages
+    
+    def test_cursor_walks_default_ordering(self):
+        """Test cursors visit every post once in created_at order."""
+        pages = self.walk('/api/posts/?pagination=cursor')
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        
+        ids = [post['id'] for page in pages for post in page]
+        expected = list(Post.objects.order_by('-created_at', '-pk').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+    
+    def test_cursor_with_views_ordering_and_previous(self):
+        """Test cursors key on the requested ordering and link back."""
+        first = self.client.get('/api/posts/?pagination=cursor&ordering=views_count')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        views = [post['views_count'] for post in first.data['results'] + second.data['results']]
+        self.assertEqual(views, sorted(views))
+        
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [post['id'] for post in back.data['results']],
+            [post['id'] for post in first.data['results']]
+        )
+    
+    def test_custom_actions_paginate(self):
+        """Test my_posts and the reading list are paginated and support cursors."""
+        self.client.force_authenticate(user=self.user)
+        for post in Post.objects.all():
+            ReadingList.objects.create(user=self.user, post=post)
+        
+        for url in ['/api/posts/my_posts/', '/api/reading-list/']:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).data['count'], 25)
+                pages = self.walk(f'{url}?pagination=cursor')
+                self.assertEqual([len(page) for page in pages], [10, 10, 5])
+    
+    def test_invalid_cursor(self):
+        """Test malformed cursors are rejected."""
+        response = self.client.get('/api/posts/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_tampered_cursor(self):
+        """Test cursors with a wrong value or key type are rejected, not a server error."""
+        for payload in [
+            {'o': '-created_at', 'v': 'garbage', 'k': 1, 'r': False},
+            {'o': '-created_at', 'v': '2024-01-01T00:00:00+00:00', 'k': 'x', 'r': False},
+            {'o': '-created_at', 'v': '2024-01-01T00:00:00+00:00', 'k': 1, 'r': 'yes'},
+        ]:
+            with self.subTest(payload=payload):
+                cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+                response = self.client.get(f'/api/posts/?cursor={cursor}')
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_page_numbers_still_supported(self):
+        """Test page number pagination remains the default."""
+        response = self.client.get('/api/posts/?page=3')
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
+
+
+class ResponseCacheTest(TestCase):
+    """Test the anonymous post response cache."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpass123"
+        )
+        self.post = Post.objects.create(
+            title="Cached Post",
+            content="Cached content",
+            author=self.user,
+            status="published"
+        )
+        view_counter.flush()
+        self.addCleanup(view_counter.flush)
+    
+    def test_anonymous_list_served_from_cache(self):
+        """Test repeated anonymous list requests hit the cache."""
+        first = self.client.get('/api/posts/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/posts/')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.json(), first.json())
+    
+    def test_authenticated_requests_bypass_cache(self):
+        """Test authenticated requests are never cached."""
+        self.client.force_authenticate(user=self.user)
+        self.client.get('/api/posts/')
+        response = self.client.get('/api/posts/')
+        self.assertFalse(response.has_header('X-Cache'))
+    
+    def test_cached_detail_counts_views_and_invalidates_on_comment(self):
+        """Test cached details still count views and drop on comment changes."""
+        url = f'/api/posts/{self.post.slug}/'
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        self.assertEqual(view_counter.pending(self.post.pk), 2)
+        
+        Comment.objects.create(post=self.post, content="Nice", email="a@example.com", is_approved=True)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.json()['comments']), 1)
+    
+    def test_post_update_invalidates_list(self):
+        """Test saving a post invalidates cached lists."""
+        self.client.get('/api/posts/')
+        self.post.title = "Renamed Post"
+        self.post.save()
+        response = self.client.get('/api/posts/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['title'], "Renamed Post")
+    
+    def test_cache_stats_admin_only(self):
+        """Test hit-rate counters are exposed to admins."""
+        admin = User.objects.create_superuser(username="admin", password="admin123")
+        self.client.force_authenticate(user=admin)
+        response = self.client.get('/api/posts/cache_stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, get_response_cache().stats())
+    
+    def test_file_backend_round_trip(self):
+        """Test the file backend stores and expires entries."""
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        backend = FileResponseCache(location=location)
+        backend.set('key', {'content': b'{}'}, timeout=60)
+        self.assertEqual(backend.get('key'), {'content': b'{}'})
+        backend.set('old', 'value', timeout=-1)
+        self.assertIsNone(backend.get('old'))
+        self.assertEqual(len(os.listdir(location)), 1)
+    
+    def test_file_backend_culls_entries(self):
+        """Test the file backend deletes expired entries and caps how many it keeps."""
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        backend = FileResponseCache(location=location, max_entries=2, cull_every=1)
+        backend.set('expired', 'value', timeout=-1)
+        for key in ['a', 'b', 'c']:
+            backend.set(key, key, timeout=60)
+        self.assertEqual(len(os.listdir(location)), 2)
+        self.assertEqual(backend.get('c'), 'c')
+    
+    def test_file_backend_requires_private_directory(self):
+        """Test the file backend refuses a missing or shared directory."""
+        with self.assertRaises(ImproperlyConfigured):
+            FileResponseCache()
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        os.chmod(location, 0o777)
+        with self.assertRaises(ImproperlyConfigured):
+            FileResponseCache(location=location)
+    
+    def test_admin_approval_invalidates_post_detail(self):
+        """Test approving comments in the admin drops the cached post detail."""
+        comment = Comment.objects.create(post=self.post, author=self.user, content="Pending", is_approved=False)
+        self.assertEqual(self.client.get(f'/api/posts/{self.post.slug}/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(f'/api/posts/{self.post.slug}/')['X-Cache'], 'HIT')
+        
+        admin = User.objects.create_superuser(username="admin", password="admin123")
+        self.client.force_login(admin)
+        self.client.post('/admin/blog/comment/', {'action': 'approve_comments', '_selected_action': [comment.pk]})
+        self.client.logout()
+        
+        response = self.client.get(f'/api/posts/{self.post.slug}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['comment_count'], 1)
+
+
+class StatisticsTest(TestCase):
+    """Test incrementally maintained blog statistics."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="writer", password="testpass123")
+        self.category = Category.objects.create(name="Tech")
+        self.post = Post.objects.create(
+            title="First Post",
+            content="First content",
+            author=self.user,
+            category=self.category,
+            status="published"
+        )
+        self.other = Post.objects.create(
+            title="Second Post",
+            content="Second content",
+            author=self.user,
+            status="draft"
+        )
+        view_counter.flush()
+        self.addCleanup(view_counter.flush)
+    
+    def test_statistics_follow_publishing_and_views(self):
+        """Test publishing and flushed views update the rollup."""
+        self.other.status = 'published'
+        self.other.save()
+        for _ in range(3):
+            self.client.get(f'/api/posts/{self.other.slug}/')
+        view_counter.flush()
+        
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/posts/statistics/')
+        self.assertEqual(response.data['total_posts'], 2)
+        self.assertEqual(response.data['total_views'], 3)
+        self.assertEqual(response.data['most_viewed_post']['slug'], 'second-post')
+        
+        self.other.delete()
+        stats = get_blog_statistics()
+        self.assertEqual(stats['total_posts'], 1)
+        self.assertEqual(stats['total_views'], 0)
+        self.assertEqual(stats['most_viewed_post']['slug'], 'first-post')
+    
+    def test_statistics_breakdowns(self):
+        """Test per-category and per-author breakdowns."""
+        response = self.client.get('/api/posts/statistics/?by=category')
+        self.assertEqual(response.data['by_category'][0]['category'], 'tech')
+        self.assertEqual(response.data['by_category'][0]['total_posts'], 1)
+        
+        response = self.client.get('/api/posts/statistics/?by=author')
+        self.assertEqual(response.data['by_author'][0]['author'], 'writer')
+    
+    def test_reconcile_matches_incremental(self):
+        """Test a full reconcile agrees with the incremental rollups."""
+        self.post.status = 'draft'
+        self.post.save()
+        self.other.status = 'published'
+        self.other.save()
+        incremental = get_blog_statistics(breakdown='author')
+        
+        StatisticsRollup.objects.update(total_posts=99)
+        reconcile_statistics()
+        self.assertEqual(get_blog_statistics(breakdown='author'), incremental)
+
+
+class ImageUploadValidationTest(TestCase):
+    """Test featured image upload validation and deduplication."""
+    
+    def setUp(self):
+        """Set up test data."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(wait_for_renditions, 30)
+        # Source digests are cached per file name, and names repeat across media roots
+        cache.clear()
+        
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+    
+    def upload(self, content, name='upload.png', title='Pictured Post'):
+        return self.client.post('/api/posts/', {
+            'title': title,
+            'content': 'Some picture content',
+            'featured_image': SimpleUploadedFile(name, content),
+        }, format='multipart')
+    
+    def image_bytes(self, size, image_format):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'teal').save(buffer, format=image_format)
+        return buffer.getvalue()
+    
+    def test_valid_image_accepted(self):
+        """Test a small PNG is accepted and stored."""
+        response = self.upload(self.image_bytes((64, 32), 'PNG'))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        wait_for_renditions(timeout=30)
+        self.assertTrue(Post.objects.get().featured_image.name.startswith('posts/'))
+    
+    def test_duplicate_uploads_share_one_file(self):
+        """Test re-uploading the same image reuses the stored file and counts both references."""
+        content = self.image_bytes((64, 32), 'PNG')
+        first = self.upload(content, name='hero.png')
+        second = self.upload(content, name='hero-again.png', title='Pictured Again')
+        self.assertEqual(first.data['featured_image'], second.data['featured_image'])
+        
+        stored = StoredFile.objects.get()
+        self.assertEqual(stored.ref_count, 2)
+        self.assertEqual(stored.digest, hashlib.sha256(content).hexdigest())
+        self.assertEqual(len(image_storage.listdir('posts')[1]), 1)
+    
+    def test_cleanup_removes_unreferenced_files(self):
+        """Test files are deleted with their renditions only once no post refers to them."""
+        self.upload(self.image_bytes((64, 32), 'PNG'))
+        self.upload(self.image_bytes((64, 32), 'PNG'), title='Pictured Again')
+        wait_for_renditions(timeout=30)
+        posts = list(Post.objects.all())
+        name = posts[0].featured_image.name
+        rendition = rendition_name('featured_image_small', name)
+        self.assertTrue(default_storage.exists(rendition))
+        
+        posts[0].delete()
+        self.assertEqual(cleanup_stored_files(grace_period=0), (0, 0))
+        posts[1].featured_image = None
+        posts[1].save()
+        self.assertEqual(StoredFile.objects.get().ref_count, 0)
+        
+        files, _ = cleanup_stored_files(grace_period=0)
+        self.assertEqual(files, 1)
+        self.assertFalse(image_storage.exists(name))
+        self.assertFalse(default_storage.exists(rendition))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_release_restarts_grace_period(self):
+        """Test a file whose last reference was just dropped outlives the grace period of its upload."""
+        self.upload(self.image_bytes((64, 32), 'PNG'))
+        StoredFile.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+        Post.objects.get().delete()
+
+        self.assertEqual(cleanup_stored_files(grace_period=3600), (0, 0))
+        self.assertTrue(image_storage.exists(StoredFile.objects.get().name))
+
+    def test_invalid_images_rejected_with_codes(self):
+        """Test oversized, unsupported, undecodable and huge images get their own error codes."""
+        cases = [
+            (b'\0' * (5 * 1024 * 1024 + 1), 'file_too_large'),
+            (self.image_bytes((64, 32), 'GIF'), 'invalid_format'),
+            (b'not an image', 'invalid_image'),
+            (self.image_bytes((4001, 1), 'PNG'), 'dimensions_too_large'),
+        ]
+        for content, code in cases:
+            with self.subTest(code=code):
+                response = self.upload(content)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(response.data['featured_image'][0].code, code)
+        self.assertFalse(Post.objects.exists())
+    
+    def test_non_image_extension_rejected(self):
+        """Test a file with an image header but an HTML or SVG name is refused."""
+        content = self.image_bytes((64, 32), 'PNG') + b'<script>alert(1)</script>'
+        for name in ['x.html', 'x.svg', 'x']:
+            with self.subTest(name=name):
+                response = self.upload(content, name=name)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(response.data['featured_image'][0].code, 'invalid_extension')
+        self.assertFalse(Post.objects.exists())
+    
+    def test_stored_extension_follows_detected_format(self):
+        """Test the stored name ends in the image's real format, not the client's extension."""
+        response = self.upload(self.image_bytes((64, 32), 'JPEG'), name='photo.PNG')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Post.objects.get().featured_image.name.endswith('.jpg'))
+    
+    def test_chunked_upload_resumes_and_attaches(self):
+        """Test a chunked upload rejects out-of-order chunks, resumes, and attaches to a post."""
+        upload_dir = override_settings(CHUNKED_UPLOAD_DIR=tempfile.mkdtemp())
+        upload_dir.enable()
+        self.addCleanup(upload_dir.disable)
+        content = self.image_bytes((64, 32), 'PNG')
+        middle = len(content) // 2
+        response = self.client.post('/api/uploads/', {'filename': 'hero.png', 'size': len(content)})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        url = f"/api/uploads/{response.data['id']}/"
+        
+        def put(start, end):
+            return self.client.put(
+                url, content[start:end], content_type='application/octet-stream',
+                HTTP_CONTENT_RANGE=f'bytes {start}-{end - 1}/{len(content)}'
+            )
+        
+        self.assertEqual(put(0, middle).data['offset'], middle)
+        conflict = put(0, middle)
+        self.assertEqual(conflict.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(conflict.data['offset'], middle)
+        # A fresh process rebuilds the running hash from the partial file
+        uploads._hashers.clear()
+        self.assertEqual(put(middle, len(content)).data['offset'], len(content))
+        
+        completed = self.client.post(f'{url}complete/')
+        self.assertEqual(completed.status_code, status.HTTP_200_OK)
+        self.assertEqual(StoredFile.objects.get().digest, hashlib.sha256(content).hexdigest())
+        response = self.client.post('/api/posts/', {
+            'title': 'Chunked Post',
+            'content': 'Some picture content',
+            'featured_image_upload': completed.data['id'],
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Post.objects.get().featured_image.name, completed.data['stored_name'])
+        self.assertEqual(StoredFile.objects.get().ref_count, 1)
+    
+    def test_chunked_upload_checks_extension(self):
+        """Test a chunked upload refuses non-image names and stores under the detected format."""
+        upload_dir = override_settings(CHUNKED_UPLOAD_DIR=tempfile.mkdtemp())
+        upload_dir.enable()
+        self.addCleanup(upload_dir.disable)
+        content = self.image_bytes((64, 32), 'PNG')
+        response = self.client.post('/api/uploads/', {'filename': 'x.html', 'size': len(content)})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['filename'][0].code, 'invalid_extension')
+        
+        response = self.client.post('/api/uploads/', {'filename': 'hero.jpeg', 'size': len(content)})
+        url = f"/api/uploads/{response.data['id']}/"
+        self.client.put(
+            url, content, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes 0-{len(content) - 1}/{len(content)}'
+        )
+        completed = self.client.post(f'{url}complete/')
+        self.assertEqual(completed.status_code, status.HTTP_200_OK)
+        self.assertTrue(completed.data['stored_name'].endswith('.png'))
+        self.assertEqual(os.listdir(settings.CHUNKED_UPLOAD_DIR), [])
+
+
+class RenditionTest(TestCase):
+    """Test featured image renditions are generated off the request path."""
+    
+    def setUp(self):
+        """Set up test data."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        # Source digests are cached by file name, which repeats across tests
+        cache.clear()
+        
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera Maker'
+        Image.new('RGB', (1000, 600), 'teal').save(buffer, format='PNG', exif=exif)
+        self.post = Post.objects.create(
+            title="Pictured Post",
+            content="Some content",
+            author=self.user,
+            status="published",
+            featured_image=SimpleUploadedFile('pictured.png', buffer.getvalue(), content_type='image/png'),
+        )
+        wait_for_renditions(timeout=30)
+    
+    def test_renditions_generated_on_upload(self):
+        """Test every negotiable format is generated after upload, so serving one encodes nothing."""
+        self.assertTrue(default_storage.exists(rendition_name('featured_image_large', self.post.featured_image.name)))
+        
+        response = self.client.get('/api/posts/')
+        urls = response.data['results'][0]['featured_image_urls']
+        self.assertEqual(set(urls), {'large', 'medium', 'small', 'webp'})
+        self.assertEqual(
+            urls['large'], f'http://testserver/media/r/featured_image_large/{self.post.featured_image.name}'
+        )
+        self.assertEqual(urls['webp'], urls['large'])
+        with mock.patch('blog.utils.renditions._encode', side_effect=AssertionError):
+            for accept in ['image/avif,image/webp,*/*', 'image/webp,*/*', '*/*']:
+                with self.subTest(accept=accept):
+                    self.assertEqual(self.client.get(urls['large'], HTTP_ACCEPT=accept).status_code, status.HTTP_200_OK)
+    
+    def test_pending_rendition_served_from_original(self):
+        """Test a rendition not generated yet is queued while the endpoint serves the original."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (1000, 600), 'navy').save(buffer, format='PNG')
+        with mock.patch('blog.signals.schedule_renditions'):
+            pending = Post.objects.create(
+                title="Pending Post",
+                content="Some content",
+                author=self.user,
+                status="published",
+                featured_image=SimpleUploadedFile('pending.png', buffer.getvalue()),
+            )
+            response = self.client.get('/api/posts/')
+        urls = {post['slug']: post['featured_image_urls'] for post in response.data['results']}
+        response = self.client.get(urls[pending.slug]['medium'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotIn('ETag', response)
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (1000, 600))
+        
+        wait_for_renditions(timeout=30)
+        response = self.client.get(urls[pending.slug]['medium'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (400, 200))
+    
+    def test_rendition_urls_need_no_lookups(self):
+        """Test rendition URLs of posts and avatars are built without storage lookups or hashing."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (300, 300), 'olive').save(buffer, format='PNG')
+        self.user.profile.avatar = SimpleUploadedFile('avatar.png', buffer.getvalue())
+        self.user.profile.save()
+        wait_for_renditions(timeout=30)
+        with mock.patch.object(FileSystemStorage, 'exists', side_effect=AssertionError), \
+                mock.patch('blog.utils.renditions._source_digest', side_effect=AssertionError):
+            posts = self.client.get('/api/posts/')
+            user = self.client.get(f'/api/users/{self.user.pk}/')
+        self.assertIn('/media/r/featured_image_small/', posts.data['results'][0]['featured_image_urls']['small'])
+        self.assertIn('/media/r/avatar_small/', user.data['profile']['avatar_small'])
+    
+    def test_rendition_endpoint_generates_and_caches(self):
+        """Test the on-demand endpoint serves a long-lived, revalidatable rendition."""
+        url = f'/media/r/featured_image_small/{self.post.featured_image.name}'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (200, 100))
+            self.assertNotIn('exif', image.info)
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_rendition_endpoint_negotiates_format(self):
+        """Test the endpoint serves AVIF, then WebP, then JPEG depending on Accept."""
+        url = f'/media/r/featured_image_large/{self.post.featured_image.name}'
+        cases = [
+            ('image/avif,image/webp,*/*', 'image/avif'),
+            ('image/avif;q=0,image/webp,*/*', 'image/webp'),
+            ('image/avif; Q=0.0, image/webp;q=bad, */*', 'image/webp'),
+            ('*/*', 'image/jpeg'),
+        ]
+        for accept, content_type in cases:
+            with self.subTest(accept=accept):
+                response = self.client.get(url, HTTP_ACCEPT=accept)
+                self.assertEqual(response['Content-Type'], content_type)
+                self.assertIn('Accept', response['Vary'])
+                with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+                    self.assertEqual(image.size, (800, 400))
+                    self.assertNotIn('exif', image.info)
+    
+    def test_rendition_endpoint_rejects_unknown_specs_and_paths(self):
+        """Test unknown specs, mismatched sources and traversal paths are not found."""
+        name = self.post.featured_image.name
+        for url in [
+            f'/media/r/huge/{name}',
+            f'/media/r/avatar_small/{name}',
+            '/media/r/featured_image_small/posts/../db.sqlite3',
+            '/media/r/featured_image_small/posts/missing.png',
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_concurrent_encoding_restores_stderr(self):
+        """Test overlapping rendition saves leave stderr pointing where it was."""
+        before = os.fstat(2)
+        barrier = threading.Barrier(4)
+        
+        def encode():
+            with quiet_stderr():
+                barrier.wait(5)
+        
+        threads = [threading.Thread(target=encode) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        after = os.fstat(2)
+        self.assertEqual((after.st_dev, after.st_ino), (before.st_dev, before.st_ino))
+    
+    def test_backfill_regenerates_and_resumes(self):
+        """Test the backfill regenerates renditions and skips sources before the checkpoint."""
+        large = rendition_name('featured_image_large', self.post.featured_image.name)
+        default_storage.delete(large)
+        checkpoint = f'{settings.MEDIA_ROOT}/checkpoint.json'
+        
+        with open(checkpoint, 'w') as handle:
+            json.dump({'featured_image': self.post.pk}, handle)
+        stats = backfill_renditions(specs=['featured_image_large'], workers=1, checkpoint=checkpoint)
+        self.assertEqual(stats['images'], 0)
+        self.assertFalse(default_storage.exists(large))
+        
+        stats = backfill_renditions(specs=['featured_image_large'], workers=1, checkpoint=checkpoint)
+        self.assertEqual((stats['images'], stats['generated']), (1, 1))
+        self.assertTrue(default_storage.exists(large))
+
+
+class ReactionViewSetTest(TestCase):
+    """Test ReactionViewSet endpoints."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpass123"
+        )
+        self.post = Post.objects.create(
+            title="Test Post",
+            content="Test content",
+            author=self.user,
+            status="published"
+        )
+        self.client.force_authenticate(user=self.user)
+    
+    def test_react_toggles_reaction_and_counter(self):
+        """Test reacting twice adds then removes the reaction and counter."""
+        data = {'post_slug': self.post.slug, 'reaction_type': 'like'}
+        
+        response = self.client.post('/api/reactions/react/', data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertTrue(Reaction.objects.filter(user=self.user, post=self.post).exists())
+        
+        response = self.client.post('/api/reactions/react/', data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'removed')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertFalse(Reaction.objects.filter(user=self.user, post=self.post).exists())
+
+
+class UserViewSetTest(TestCase):
+    """Test UserViewSet endpoints."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.author = User.objects.create_user(username="author", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+    
+    def add_followers(self, count):
+        for index in range(count):
+            follower = User.objects.create_user(username=f"follower{Follow.objects.count()}-{index}")
+            Follow.objects.create(follower=follower, following=self.author)
+            if index % 2:
+                Follow.objects.create(follower=self.user, following=follower)
+    
+    def test_followers_check_is_following_in_constant_queries(self):
+        """Test is_following is resolved for the whole page at once, however many followers there are."""
+        url = f'/api/users/{self.author.pk}/followers/'
+        self.add_followers(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        self.add_followers(6)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        
+        self.assertEqual(len(many), len(few))
+        followed = set(Follow.objects.filter(follower=self.user).values_list('following_id', flat=True))
+        for row in response.data['results']:
+            self.assertEqual(row['follower']['is_following'], row['follower']['id'] in followed)
+            self.assertFalse(row['following']['is_following'])
+    
+    def test_follow_toggle_updates_counters(self):
+        """Test follow and unfollow keep both counters in step, and duplicates change nothing."""
+        url = f'/api/users/{self.author.pk}/follow/'
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.author.profile.refresh_from_db()
+        self.user.profile.refresh_from_db()
+        self.assertEqual((self.author.profile.follower_count, self.user.profile.following_count), (1, 1))
+        
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Follow.objects.exists())
+        self.author.profile.refresh_from_db()
+        self.assertEqual(self.author.profile.follower_count, 0)
+
+    def test_profile_saves_keep_follow_counters(self):
+        """Test saving a stale user or profile, or sending counters, leaves the follow counters alone."""
+        stale = self.user.profile
+        self.client.post(f'/api/users/{self.author.pk}/follow/')
+        self.user.save()
+        response = self.client.put('/api/users/profile/', {'bio': 'Hello', 'following_count': 50})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(stale.following_count, 0)
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.bio, profile.following_count), ('Hello', 1))
+
+    def test_recount_follows_fixes_drift(self):
+        """Test the recount restores counters from Follow rows."""
+        self.add_followers(3)
+        self.author.profile.refresh_from_db()
+        self.author.profile.follower_count = 99
+        self.author.profile.save()
+        
+        self.assertEqual(recount_follows(batch_size=2), 5)
+        self.author.profile.refresh_from_db()
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.author.profile.follower_count, 3)
+        self.assertEqual(self.user.profile.following_count, 1)
+        self.assertEqual(recount_follows(), 0)
+    
+    def test_suggestions_rank_friends_of_friends_then_co_followed(self):
+        """Test stored suggestions rank two-hop follows above co-follows and skip followed users."""
+        x, y, z, w = (User.objects.create_user(username=name) for name in 'xyzw')
+        for follower, following in [
+            (self.user, self.author), (self.author, x), (self.author, y), (z, self.author), (z, w),
+        ]:
+            Follow.objects.create(follower=follower, following=following)
+        
+        stats = compute_follow_suggestions(top_k=5)
+        self.assertEqual(stats['edges'], 5)
+        response = self.client.get('/api/users/suggestions/')
+        self.assertEqual(
+            [(row['user']['username'], row['score']) for row in response.data],
+            [('x', 1.0), ('y', 1.0), ('w', 0.1)]
+        )
+        
+        Follow.objects.create(follower=self.user, following=x)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/users/suggestions/')
+        self.assertEqual([row['user']['username'] for row in response.data], ['y', 'w'])
+    
+    @skipUnless(vectorized_available(), "NumPy and SciPy are not installed")
+    def test_vectorized_suggestions_match_python(self):
+        """Test the sparse matrix pass stores the same suggestions as the pure Python one."""
+        rng = random.Random(1)
+        edges = list({(rng.randrange(60), rng.randrange(60)) for _ in range(400)} - {(n, n) for n in range(60)})
+        self.assertEqual(
+            dict(suggestions._vectorized_suggestions(edges, top_k=5, chunk_size=7)),
+            dict(suggestions._python_suggestions(edges, top_k=5)),
+        )
+
+
+@override_settings(BACKGROUND_WORKERS=0)
+class FeedTest(TestCase):
+    """Test the follow-graph home feed."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.reader = User.objects.create_user(username="reader", password="testpass123")
+        self.alice = User.objects.create_user(username="alice", password="testpass123")
+        self.bob = User.objects.create_user(username="bob", password="testpass123")
+        self.client.force_authenticate(user=self.reader)
+    
+    def publish(self, author, title, status='published'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(title=title, content="Some feed content", author=author, status=status)
+    
+    def follow(self, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/users/{user.pk}/follow/')
+    
+    def feed(self):
+        titles, url = [], '/api/feed/'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            titles += [post['title'] for post in response.data['results']]
+            url = response.data['next']
+        return titles
+    
+    def test_feed_follows_publishing_and_the_follow_graph(self):
+        """Test follows backfill, publishing fans out, unpublishing and unfollowing remove posts."""
+        self.publish(self.alice, "Alice Before Follow")
+        self.follow(self.alice)
+        self.publish(self.bob, "Bob Unfollowed")
+        draft = self.publish(self.alice, "Alice Draft", status='draft')
+        posts = [self.publish(self.alice, f"Alice Post {i}") for i in range(11)]
+        
+        titles = self.feed()
+        self.assertEqual(titles, [post.title for post in reversed(posts)] + ["Alice Before Follow"])
+        self.assertEqual(TimelineEntry.objects.filter(user=self.reader).count(), 12)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            draft.status = 'published'
+            draft.save()
+        posts[-1].status = 'draft'
+        posts[-1].save()
+        titles = self.feed()
+        self.assertIn("Alice Draft", titles)
+        self.assertNotIn(posts[-1].title, titles)
+        
+        self.client.delete(f'/api/users/{self.alice.pk}/follow/')
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+    
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_popular_authors_merged_at_read_time(self):
+        """Test authors over the fan-out limit are read from their posts, not timelines."""
+        Follow.objects.create(follower=self.bob, following=self.alice)
+        self.alice.profile.follower_count = 1
+        self.alice.profile.save()
+        self.follow(self.alice)
+        self.follow(self.bob)
+        self.publish(self.alice, "Alice Popular")
+        self.publish(self.bob, "Bob Regular")
+        
+        self.assertEqual(self.feed(), ["Bob Regular", "Alice Popular"])
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('post__title', flat=True)), ["Bob Regular"]
+        )
+    
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_posts_published_over_the_limit_stay_merged(self):
+        """Test posts published while their author was over the limit remain after they drop below it."""
+        self.alice.profile.follower_count = 2
+        self.alice.profile.save()
+        self.follow(self.alice)
+        self.publish(self.alice, "Alice Popular")
+        
+        self.alice.profile.follower_count = 1
+        self.alice.profile.save()
+        self.publish(self.alice, "Alice Regular")
+        self.assertEqual(self.feed(), ["Alice Regular", "Alice Popular"])
+        self.assertEqual(list(Post.objects.filter(pulled=True).values_list('title', flat=True)), ["Alice Popular"])
+
+
+class RecommendationTest(TestCase):
+    """Test precomputed "readers also liked" recommendations."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        # Flush buffered detail views so the buffer's timer does not write them during a later test
+        self.addCleanup(view_counter.flush)
+        author = User.objects.create_user(username="author", password="testpass123")
+        self.readers = [User.objects.create_user(username=f"reader{i}") for i in range(3)]
+        self.posts = {
+            name: Post.objects.create(title=f"Post {name}", content="Some content", author=author, status="published")
+            for name in 'abcd'
+        }
+        for reader, names in zip(self.readers, ['ab', 'ab', 'cd']):
+            for name in names:
+                toggle_reaction(reader, self.posts[name], 'like')
+        ReadingList.objects.create(user=self.readers[1], post=self.posts['c'])
+    
+    def also_liked(self, name):
+        response = self.client.get(f"/api/posts/{self.posts[name].slug}/")
+        return [(post['title'], post['score']) for post in response.data['also_liked']]
+    
+    def test_neighbours_ranked_by_cosine_similarity(self):
+        """Test posts sharing more readers rank first, and scores are cosine similarities."""
+        stats = compute_also_liked(top_n=5)
+        self.assertEqual((stats['interactions'], stats['posts']), (7, 4))
+        self.assertIsNotNone(stats['seconds'])
+        self.assertEqual(self.also_liked('a'), [('Post b', 1.0), ('Post c', 0.5)])
+        self.assertEqual(self.also_liked('d'), [('Post c', 0.7071)])
+    
+    def test_incremental_refresh_only_touches_affected_posts(self):
+        """Test an incremental run recomputes changed posts and their co-read posts only."""
+        compute_also_liked(top_n=5)
+        toggle_reaction(self.readers[2], self.posts['a'], 'like')
+        
+        stats = compute_also_liked(top_n=5, incremental=True)
+        self.assertTrue(stats['incremental'])
+        self.assertEqual(stats['posts'], 4)
+        self.assertIn(('Post d', 0.5774), self.also_liked('a'))
+        self.assertEqual(compute_also_liked(top_n=5, incremental=True)['posts'], 0)
+    
+    @skipUnless(vectorized_available(), "NumPy and SciPy are not installed")
+    def test_vectorized_neighbours_match_python(self):
+        """Test the sparse matrix pass ranks the same neighbours as the pure Python one."""
+        rng = random.Random(2)
+        pairs = {(rng.randrange(40), rng.randrange(80)) for _ in range(600)}
+        targets = {post_id for _, post_id in pairs}
+        self.assertEqual(
+            list(recommendations._vectorized_neighbours(pairs, targets, top_n=5, chunk_size=9)),
+            list(recommendations._python_neighbours(pairs, targets, top_n=5)),
+        )
+    
+    def test_incremental_refresh_drops_removed_interactions(self):
+        """Test a removed like is dropped from the neighbours of posts it linked."""
+        compute_also_liked(top_n=5)
+        self.assertIn(('Post a', 1.0), self.also_liked('b'))
+        toggle_reaction(self.readers[0], self.posts['a'], 'like')
+        toggle_reaction(self.readers[1], self.posts['a'], 'like')
+        
+        compute_also_liked(top_n=5, incremental=True)
+        self.assertEqual(self.also_liked('a'), [])
+        self.assertEqual(self.also_liked('b'), [('Post c', 0.5)])
+
+
+@override_settings(BACKGROUND_WORKERS=0, RELATED_POSTS_TOP_K=2)
+class RelatedContentTest(TestCase):
+    """Test content-based related posts from tags and TF-IDF vectors."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        # Flush buffered detail views so the buffer's timer does not write them during a later test
+        self.addCleanup(view_counter.flush)
+        self.author = User.objects.create_user(username="author", password="testpass123")
+        self.python = Tag.objects.create(name="Python")
+        self.django = Tag.objects.create(name="Django")
+        cooking = Tag.objects.create(name="Cooking")
+        self.posts = {}
+        for name, title, content, tags, status_value in [
+            ('orm', "Django ORM queries", "Speed up django orm queries with select_related.", [self.python, self.django], 'published'),
+            ('views', "Django class views", "Class based views keep django code small.", [self.django], 'published'),
+            ('bread', "Baking bread", "Flour, water and yeast make bread.", [cooking], 'published'),
+            ('draft', "Django ORM queries again", "More django orm queries.", [self.django], 'draft'),
+        ]:
+            self.posts[name] = Post.objects.create(title=title, content=content, author=self.author, status=status_value)
+            self.posts[name].tags.set(tags)
+    
+    def related(self, name):
+        response = self.client.get(f"/api/posts/{self.posts[name].slug}/")
+        return [post['title'] for post in response.data['related']]
+    
+    def test_rebuild_ranks_by_tags_and_text(self):
+        """Test a full rebuild stores packed vectors and ranks shared tags and words first."""
+        stats = compute_related_posts()
+        self.assertEqual((stats['posts'], stats['stored']), (3, 2))
+        self.assertEqual(self.related('orm'), ["Django class views"])
+        self.assertEqual(self.related('bread'), [])
+        
+        vector = PostVector.objects.get(post=self.posts['orm'])
+        self.assertEqual(len(vector.tags), 8)
+        self.assertEqual(len(vector.terms), len(vector.weights))
+    
+    def test_saving_post_updates_neighbours(self):
+        """Test saving a post refreshes its vector and its place in other posts' rows."""
+        compute_related_posts()
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                title="Django ORM tips", content="Fewer django orm queries.", author=self.author, status="published"
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            post.tags.set([self.python, self.django])
+        self.assertEqual(self.related('orm'), ["Django ORM tips", "Django class views"])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts['draft'].status = 'published'
+            self.posts['draft'].save()
+        self.assertEqual(self.related('orm'), ["Django ORM queries again", "Django ORM tips"])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            post.status = 'draft'
+            post.save()
+        # The full row lost a post, so it is rescored and the dropped neighbour returns
+        self.assertEqual(self.related('orm'), ["Django ORM queries again", "Django class views"])
+        self.assertFalse(PostVector.objects.filter(post=post).exists())
+
+    def test_vector_refresh_coalesced_and_skipped_when_unchanged(self):
+        """Test one transaction's saves and retags refresh vectors once, and unchanged saves not at all."""
+        self.client.force_authenticate(user=self.author)
+        with mock.patch('blog.signals.update_post_vectors') as update:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/posts/', {
+                    'title': "Django ORM tips", 'content': "Fewer django orm queries.",
+                    'tags': [self.python.pk, self.django.pk], 'status': 'published',
+                })
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            post = Post.objects.get(title="Django ORM tips")
+            update.assert_called_once_with([post.pk])
+
+            update.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                post.views_count = 5
+                post.save()
+                post.tags.add(self.django)
+            update.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                post.title = "Django ORM tricks"
+                post.save()
+                self.django.posts.remove(post, self.posts['views'])
+            update.assert_called_once_with(sorted([post.pk, self.posts['views'].pk]))
+
+    @skipUnless(vectorized_available(), "NumPy and SciPy are not installed")
+    def test_vectorized_neighbours_match_python(self):
+        """Test the sparse matrix pass ranks the same related posts as the pure Python one."""
+        rng = random.Random(3)
+        words = [f"word{i}" for i in range(30)]
+        vectors = {}
+        for post_id in range(1, 61):
+            post = Post(pk=post_id, title=' '.join(rng.sample(words, 2)), content=' '.join(rng.choices(words, k=12)))
+            vector = related.build_vector(post, rng.sample(range(8), rng.randrange(3)))
+            vectors[post_id] = related._unpack_vector(vector.terms, vector.weights, vector.tags)
+        self.assertEqual(
+            list(related._vectorized_neighbours(vectors, vectors.keys(), top_k=5, chunk_size=11)),
+            list(related._python_neighbours(vectors, vectors.keys(), top_k=5)),
+        )
 
 
 class CommentViewSetTest(TestCase):
@@ -133,6 +1304,8 @@ class CommentViewSetTest(TestCase):
     def setUp(self):
         """Set up test data."""
         self.client = APIClient()
+        # Flush buffered detail views so the buffer's timer does not write them during a later test
+        self.addCleanup(view_counter.flush)
         self.user = User.objects.create_user(
             username="testuser",
             password="testpass123"
@@ -190,6 +1363,34 @@ class CommentViewSetTest(TestCase):
         unapproved_comment.refresh_from_db()
         self.assertTrue(unapproved_comment.is_approved)
     
+    def test_post_detail_embeds_first_approved_comments(self):
+        """Test post detail embeds a page of approved comments with a cursor."""
+        for i in range(11):
+            Comment.objects.create(post=self.post, author=self.user, content=f"Reply {i}", is_approved=True)
+        Comment.objects.create(post=self.post, author=self.user, content="Hidden", is_approved=False)
+        
+        response = self.client.get(f'/api/posts/{self.post.slug}/')
+        self.assertEqual(response.data['comment_count'], 12)
+        self.assertEqual(len(response.data['comments']), 10)
+        self.assertNotIn('Hidden', [comment['content'] for comment in response.data['comments']])
+        
+        rest = self.client.get(response.data['comments_next'])
+        self.assertEqual([comment['content'] for comment in rest.data['results']], ['Reply 9', 'Reply 10'])
+        self.assertIsNone(rest.data['next'])
+    
+    def test_comment_count_follows_approval(self):
+        """Test the stored approved comment count follows approve, reject and delete."""
+        pending = Comment.objects.create(post=self.post, email="a@example.com", content="Pending")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        
+        self.client.force_authenticate(user=self.admin)
+        self.client.post(f'/api/comments/{pending.id}/approve/')
+        self.client.post(f'/api/comments/{self.comment.id}/reject/')
+        self.client.delete(f'/api/comments/{pending.id}/')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+    
     def test_approve_comment_non_admin_forbidden(self):
         """Test approving comment as non-admin is forbidden."""
         self.client.force_authenticate(user=self.user)
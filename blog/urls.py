@@ -2,7 +2,7 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from blog.views import CategoryViewSet, TagViewSet, PostViewSet, CommentViewSet, UserViewSet, ReactionViewSet, ReadingListViewSet
+from blog.views import CategoryViewSet, TagViewSet, PostViewSet, CommentViewSet, UserViewSet, ReactionViewSet, ReadingListViewSet, ImageUploadViewSet, FeedViewSet
 from blog.views.auth import google_auth, login_view, register_view, logout_view
 
 router = DefaultRouter()
@@ -13,6 +13,8 @@ router.register(r'comments', CommentViewSet)
 router.register(r'users', UserViewSet)
 router.register(r'reactions', ReactionViewSet, basename='reaction')
 router.register(r'reading-list', ReadingListViewSet, basename='readinglist')
+router.register(r'uploads', ImageUploadViewSet, basename='imageupload')
+router.register(r'feed', FeedViewSet, basename='feed')
 
 urlpatterns = [
     path('', include(router.urls)),
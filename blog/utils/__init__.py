@@ -1,13 +1,48 @@
 """Blog utilities package."""
 
-from .filters import PostFilter
-from .analytics import get_blog_statistics
+from .comments import recount_comments
+from .content import backfill_content_metrics
+from .media import cleanup_stored_files, recount_stored_files
+from .filters import PostFilter, PostSearchFilter
+from .follows import follow_user, unfollow_user, recount_follows
+from .analytics import get_blog_statistics, reconcile_statistics
+from .pagination import BlogPagination, KeysetPagination
+from .renditions import backfill_renditions
+from .reactions import load_user_reactions, toggle_reaction, recount_reactions
+from .recommendations import compute_also_liked
+from .related import compute_related_posts
+from .search import rebuild_search_index, search_index_available
+from .suggestions import compute_follow_suggestions
+from .uploads import expire_uploads
+from .view_counter import view_counter
 from .validators import validate_avatar_image, validate_featured_image
 from . import image_processors
 
 __all__ = [
     'PostFilter', 
+    'PostSearchFilter',
     'get_blog_statistics',
+    'reconcile_statistics',
+    'backfill_content_metrics',
+    'recount_comments',
+    'follow_user',
+    'unfollow_user',
+    'recount_follows',
+    'cleanup_stored_files',
+    'recount_stored_files',
+    'BlogPagination',
+    'KeysetPagination',
+    'load_user_reactions',
+    'toggle_reaction',
+    'recount_reactions',
+    'compute_also_liked',
+    'compute_related_posts',
+    'backfill_renditions',
+    'rebuild_search_index',
+    'search_index_available',
+    'compute_follow_suggestions',
+    'expire_uploads',
+    'view_counter',
     'validate_avatar_image',
     'validate_featured_image',
 ]
\ No newline at end of file
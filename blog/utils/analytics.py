@@ -1,24 +1,192 @@
-"""Analytics utilities for blog statistics."""
+"""Analytics utilities for blog statistics.
 
-from django.db.models import Sum, Count
-from blog.models import Post
+Statistics are served from ``StatisticsRollup`` rows that are updated
+incrementally when posts are published, unpublished or deleted and when
+buffered view counts are flushed. ``reconcile_statistics`` rebuilds every
+rollup from the Post table and is meant to run periodically.
+"""
 
+from collections import defaultdict
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from blog.models import Category, Post, StatisticsRollup
 
-def get_blog_statistics():
-    """Get overall blog statistics."""
-    stats = Post.objects.filter(status='published').aggregate(
-        total_posts=Count('id'),
-        total_views=Sum('views_count')
+
+SCOPE_FIELDS = {'category': 'category_id', 'author': 'author_id'}
+BREAKDOWNS = {'category': (Category, 'slug'), 'author': (User, 'username')}
+
+
+def _scope_keys(category_id, author_id):
+    """Get the rollup keys a published post contributes to."""
+    keys = [('site', 0), ('author', author_id)]
+    if category_id:
+        keys.append(('category', category_id))
+    return keys
+
+
+def _scope_filter(scope, scope_id):
+    if scope == 'site':
+        return {}
+    return {SCOPE_FIELDS[scope]: scope_id}
+
+
+def _most_viewed(scope, scope_id):
+    return Post.objects.filter(
+        status='published', **_scope_filter(scope, scope_id)
+    ).order_by('-views_count', 'pk').first()
+
+
+def _get_rollups(keys):
+    """Get (creating if needed) the rollup rows for the given keys, locked for update."""
+    lookup = Q()
+    for scope, scope_id in keys:
+        lookup |= Q(scope=scope, scope_id=scope_id)
+    existing = {(rollup.scope, rollup.scope_id) for rollup in StatisticsRollup.objects.filter(lookup)}
+    missing = [key for key in keys if key not in existing]
+    if missing:
+        StatisticsRollup.objects.bulk_create(
+            [StatisticsRollup(scope=scope, scope_id=scope_id) for scope, scope_id in missing],
+            ignore_conflicts=True,
+        )
+    return list(StatisticsRollup.objects.select_for_update().select_related('most_viewed_post').filter(lookup))
+
+
+def _ensure_rollups():
+    """Build the rollups from scratch if they were never reconciled.
+
+    Returns False when a reconcile ran, since it already reflects the
+    change being applied.
+    """
+    if StatisticsRollup.objects.filter(scope='site').exists():
+        return True
+    reconcile_statistics()
+    return False
+
+
+def apply_post_contribution(post_values, sign):
+    """Add (``sign=1``) or remove (``sign=-1``) one published post from its rollups.
+
+    ``post_values`` holds the post's ``id``, ``category_id``, ``author_id``
+    and ``views_count`` as they were when it counted as published.
+    """
+    if not _ensure_rollups():
+        return
+    keys = _scope_keys(post_values['category_id'], post_values['author_id'])
+    views = post_values['views_count']
+    with transaction.atomic():
+        for rollup in _get_rollups(keys):
+            StatisticsRollup.objects.filter(pk=rollup.pk).update(
+                total_posts=F('total_posts') + sign,
+                total_views=F('total_views') + sign * views,
+            )
+            current = rollup.most_viewed_post
+            # Deleting the leader nulls the reference before this runs
+            if sign < 0 and rollup.most_viewed_post_id in (post_values['id'], None):
+                most_viewed = _most_viewed(rollup.scope, rollup.scope_id)
+                StatisticsRollup.objects.filter(pk=rollup.pk).update(most_viewed_post=most_viewed)
+            elif sign > 0 and (current is None or views > current.views_count):
+                StatisticsRollup.objects.filter(pk=rollup.pk).update(most_viewed_post_id=post_values['id'])
+
+
+def apply_view_deltas(deltas):
+    """Add flushed view increments to the rollups of published posts.
+
+    Runs one query for the affected posts and one update per affected
+    rollup, and promotes a post to most viewed when it overtakes the
+    current one.
+    """
+    if not deltas or not _ensure_rollups():
+        return
+    posts = Post.objects.filter(pk__in=list(deltas), status='published').values(
+        'id', 'category_id', 'author_id', 'views_count'
+    )
+    views_by_key = defaultdict(int)
+    leader_by_key = {}
+    for post in posts:
+        for key in _scope_keys(post['category_id'], post['author_id']):
+            views_by_key[key] += deltas[post['id']]
+            leader = leader_by_key.get(key)
+            if leader is None or post['views_count'] > leader['views_count']:
+                leader_by_key[key] = post
+    if not views_by_key:
+        return
+
+    with transaction.atomic():
+        for rollup in _get_rollups(list(views_by_key)):
+            key = (rollup.scope, rollup.scope_id)
+            changes = {'total_views': F('total_views') + views_by_key[key]}
+            leader = leader_by_key[key]
+            current = rollup.most_viewed_post
+            if current is None or leader['views_count'] > current.views_count:
+                changes['most_viewed_post_id'] = leader['id']
+            StatisticsRollup.objects.filter(pk=rollup.pk).update(**changes)
+
+
+def reconcile_statistics():
+    """Rebuild every rollup from the published posts. Returns rollups written."""
+    published = Post.objects.filter(status='published')
+    rollups = {}
+
+    totals = published.aggregate(total_posts=Count('id'), total_views=Sum('views_count'))
+    rollups[('site', 0)] = StatisticsRollup(
+        scope='site', scope_id=0,
+        total_posts=totals['total_posts'] or 0, total_views=totals['total_views'] or 0,
+        most_viewed_post=published.order_by('-views_count', 'pk').first(),
     )
-    
-    most_viewed = Post.objects.filter(status='published').order_by('-views_count').first()
-    
+
+    for scope, field in SCOPE_FIELDS.items():
+        grouped = published.exclude(**{f'{field}__isnull': True}).values(field).annotate(
+            total_posts=Count('id'), total_views=Sum('views_count')
+        ).order_by()
+        for row in grouped:
+            rollups[(scope, row[field])] = StatisticsRollup(
+                scope=scope, scope_id=row[field],
+                total_posts=row['total_posts'], total_views=row['total_views'] or 0,
+            )
+        leaders = published.exclude(**{f'{field}__isnull': True}).annotate(
+            rank=Window(RowNumber(), partition_by=[F(field)], order_by=[F('views_count').desc(), F('pk').asc()])
+        ).filter(rank=1).values_list(field, 'pk')
+        for scope_id, post_id in leaders:
+            rollups[(scope, scope_id)].most_viewed_post_id = post_id
+
+    with transaction.atomic():
+        StatisticsRollup.objects.all().delete()
+        StatisticsRollup.objects.bulk_create(rollups.values())
+    return len(rollups)
+
+
+def _serialize_rollup(rollup):
+    most_viewed = rollup.most_viewed_post if rollup else None
     return {
-        'total_posts': stats['total_posts'] or 0,
-        'total_views': stats['total_views'] or 0,
+        'total_posts': rollup.total_posts if rollup else 0,
+        'total_views': rollup.total_views if rollup else 0,
         'most_viewed_post': {
             'title': most_viewed.title if most_viewed else None,
             'slug': most_viewed.slug if most_viewed else None,
             'views': most_viewed.views_count if most_viewed else 0
         }
-    }
\ No newline at end of file
+    }
+
+
+def get_blog_statistics(breakdown=None):
+    """Get overall blog statistics, optionally with a per-category or per-author breakdown."""
+    rollup = StatisticsRollup.objects.select_related('most_viewed_post').filter(scope='site').first()
+    if rollup is None:
+        reconcile_statistics()
+        rollup = StatisticsRollup.objects.select_related('most_viewed_post').filter(scope='site').first()
+    stats = _serialize_rollup(rollup)
+
+    if breakdown in BREAKDOWNS:
+        model, name_field = BREAKDOWNS[breakdown]
+        rows = list(
+            StatisticsRollup.objects.filter(scope=breakdown, total_posts__gt=0).select_related('most_viewed_post')
+        )
+        names = dict(model.objects.filter(
+            pk__in=[row.scope_id for row in rows]
+        ).values_list('id', name_field))
+        stats[f'by_{breakdown}'] = [
+            {breakdown: names.get(row.scope_id), **_serialize_rollup(row)} for row in rows
+        ]
+    return stats
@@ -0,0 +1,258 @@
+"""Response cache for anonymous post reads with version-based invalidation."""
+
+import hashlib
+import os
+import pickle
+import stat
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+class LocMemResponseCache:
+    """In-process LRU cache backend."""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires = time.time() + timeout if timeout is not None else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class FileResponseCache:
+    """File-based cache backend shared by every process on the host.
+
+    ``location`` must be a directory private to the user running the site:
+    entries are pickled, so anyone able to write there could run code. It
+    is created with mode 0700 and refused if another user owns it or can
+    write to it. Expired entries are culled every ``cull_every`` writes,
+    then the oldest ones while more than ``max_entries`` remain.
+    """
+
+    def __init__(self, location=None, max_entries=1000, cull_every=100):
+        if not location:
+            raise ImproperlyConfigured('FileResponseCache needs a private LOCATION directory.')
+        self.location = location
+        self.max_entries = max_entries
+        self.cull_every = cull_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.location, mode=0o700, exist_ok=True)
+        self._check_private()
+
+    def _check_private(self):
+        info = os.stat(self.location)
+        if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+            raise ImproperlyConfigured(f'Response cache directory {self.location} is owned by another user.')
+        if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise ImproperlyConfigured(f'Response cache directory {self.location} is writable by other users.')
+
+    def _path(self, key):
+        return os.path.join(self.location, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                expires = pickle.load(cache_file)
+                expired = expires is not None and expires < time.time()
+                value = None if expired else pickle.load(cache_file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expired:
+            self._remove(path)
+        return value
+
+    def set(self, key, value, timeout=None):
+        expires = time.time() + timeout if timeout is not None else None
+        path = self._path(key)
+        # Write to a temp file and rename so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=self.location, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as cache_file:
+            pickle.dump(expires, cache_file, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(value, cache_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.cull_every == 0
+        if due:
+            self.cull()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        for name in os.listdir(self.location):
+            if not name.endswith('.tmp'):
+                yield os.path.join(self.location, name)
+
+    def cull(self):
+        """Delete expired entries, then the least recently written beyond ``max_entries``."""
+        now = time.time()
+        remaining = []
+        for path in self._entries():
+            try:
+                with open(path, 'rb') as cache_file:
+                    expires = pickle.load(cache_file)
+                modified = os.path.getmtime(path)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                continue
+            if expires is not None and expires < now:
+                self._remove(path)
+            else:
+                remaining.append((modified, path))
+        remaining.sort()
+        for _, path in remaining[:max(len(remaining) - self.max_entries, 0)]:
+            self._remove(path)
+
+    def clear(self):
+        for name in os.listdir(self.location):
+            self._remove(os.path.join(self.location, name))
+
+
+class DjangoResponseCache:
+    """Backend delegating to one of Django's configured caches."""
+
+    def __init__(self, alias='default'):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, timeout=None):
+        self.cache.set(key, value, timeout)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class ResponseCache:
+    """Cache rendered responses keyed on path, query string, content type and scope version.
+
+    Each response belongs to a scope (``posts:list`` or ``post:<slug>``).
+    Invalidating a scope stores a fresh version token for it, so every
+    key built from the old version is simply never read again.
+    """
+
+    def __init__(self, backend, timeout=60):
+        self.backend = backend
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._stats_lock = threading.Lock()
+
+    def version(self, scope):
+        """Get the current version token of a scope."""
+        version = self.backend.get(f'version:{scope}')
+        if version is None:
+            version = self.invalidate(scope)
+        return version
+
+    def invalidate(self, *scopes):
+        """Move scopes to a fresh version, orphaning their cached responses."""
+        version = uuid.uuid4().hex
+        for scope in scopes:
+            self.backend.set(f'version:{scope}', version, None)
+        with self._stats_lock:
+            self.invalidations += len(scopes)
+        return version
+
+    def build_key(self, request, scope):
+        """Build the cache key for a request within a scope."""
+        query = sorted(request.query_params.lists())
+        raw = '|'.join([
+            request.path, repr(query), request.accepted_media_type or '', self.version(scope)
+        ])
+        return 'response:' + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key, entry):
+        self.backend.set(key, entry, self.timeout)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        """Get hit-rate counters for this process."""
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'invalidations': self.invalidations,
+            }
+
+
+_response_cache = None
+
+
+def get_response_cache():
+    """Get the response cache configured by ``POST_RESPONSE_CACHE``."""
+    global _response_cache
+    if _response_cache is None:
+        config = getattr(settings, 'POST_RESPONSE_CACHE', {})
+        backend_class = import_string(config.get('BACKEND', 'blog.utils.cache.LocMemResponseCache'))
+        _response_cache = ResponseCache(
+            backend_class(**config.get('OPTIONS', {})),
+            timeout=config.get('TIMEOUT', 60),
+        )
+    return _response_cache
+
+
+def invalidate_post_responses(*slugs):
+    """Invalidate cached post lists and the detail responses of the given posts."""
+    get_response_cache().invalidate('posts:list', *(f'post:{slug}' for slug in slugs))
+
+
+def is_cacheable(request):
+    """Only anonymous GETs rendered by a non-browsable renderer are cached."""
+    renderer = getattr(request, 'accepted_renderer', None)
+    return (
+        request.method == 'GET'
+        and not request.user.is_authenticated
+        and renderer is not None
+        and renderer.format != 'api'
+    )
@@ -0,0 +1,19 @@
+"""Maintenance of the stored approved-comment counter on posts."""
+
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from blog.models import Comment, Post
+
+
+def recount_comments(post_ids=None):
+    """Recompute ``Post.comment_count`` from approved comments in one UPDATE.
+
+    Limited to ``post_ids`` when given. Returns the number of posts updated.
+    """
+    approved = Comment.objects.filter(post=OuterRef('pk'), is_approved=True).order_by().values(
+        'post'
+    ).annotate(count=Count('id')).values('count')
+    posts = Post.objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    return posts.update(comment_count=Coalesce(Subquery(approved), Value(0)))
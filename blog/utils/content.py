@@ -0,0 +1,25 @@
+"""Maintenance of precomputed post content metrics."""
+
+from blog.models import Post
+
+
+def backfill_content_metrics(batch_size=500):
+    """Recompute excerpt, word count and read time for every post.
+
+    Only ``content`` is loaded; posts are rewritten in primary key batches
+    through ``bulk_update``. Returns the number of posts processed.
+    """
+    processed = 0
+    last_pk = 0
+    while True:
+        posts = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'content')[:batch_size]
+        )
+        if not posts:
+            break
+        last_pk = posts[-1].pk
+        for post in posts:
+            post.update_content_metrics()
+        Post.objects.bulk_update(posts, Post.CONTENT_METRIC_FIELDS)
+        processed += len(posts)
+    return processed
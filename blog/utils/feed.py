@@ -0,0 +1,117 @@
+"""Home feeds built from the follow graph.
+
+Publishing a post fans it out to a ``TimelineEntry`` per follower as a
+background task, so a feed page is one range scan of the reader's
+timeline. Authors with more than ``FEED_FANOUT_MAX_FOLLOWERS`` followers
+are not fanned out; their posts are merged into the page when it is read.
+A post published in that state is marked ``pulled`` and keeps being
+merged after its author drops below the limit, since it never reached
+any timeline. Following someone backfills their recent posts and
+unfollowing prunes them.
+"""
+
+from itertools import islice
+from django.conf import settings
+from django.db.models import Q
+from blog.models import Follow, Post, TimelineEntry, UserProfile
+
+
+def fan_out_limit():
+    """Get the follower count above which an author's posts are merged at read time."""
+    return getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', 5000)
+
+
+def is_fanned_out(author_id):
+    """Check whether an author's posts are written to their followers' timelines."""
+    return not UserProfile.objects.filter(user_id=author_id, follower_count__gt=fan_out_limit()).exists()
+
+
+def _insert_entries(entries, batch_size):
+    entries = iter(entries)
+    while batch := list(islice(entries, batch_size)):
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post_id, batch_size=1000):
+    """Add a published post to the timeline of every follower of its author.
+
+    Skipped for posts that are no longer published by the time this runs.
+    Posts of authors over the fan-out limit are marked ``pulled`` instead.
+    """
+    post = Post.objects.filter(pk=post_id, status='published').only(
+        'pk', 'author_id', 'created_at', 'pulled'
+    ).first()
+    if post is None:
+        return
+    fanned_out = is_fanned_out(post.author_id)
+    if post.pulled == fanned_out:
+        Post.objects.filter(pk=post.pk).update(pulled=not fanned_out)
+    if not fanned_out:
+        return
+    follower_ids = Follow.objects.filter(following_id=post.author_id).values_list(
+        'follower_id', flat=True
+    ).iterator(chunk_size=batch_size)
+    _insert_entries((
+        TimelineEntry(user_id=follower_id, post_id=post.pk, author_id=post.author_id, created_at=post.created_at)
+        for follower_id in follower_ids
+    ), batch_size)
+
+
+def remove_post(post_id):
+    """Remove a post from every timeline, e.g. when it is unpublished."""
+    TimelineEntry.objects.filter(post_id=post_id).delete()
+
+
+def backfill_timeline(user_id, author_id, limit=None, batch_size=1000):
+    """Add an author's most recent published posts to a new follower's timeline."""
+    if not is_fanned_out(author_id):
+        return
+    if limit is None:
+        limit = getattr(settings, 'FEED_BACKFILL_LIMIT', 50)
+    posts = Post.objects.filter(author_id=author_id, status='published').order_by(
+        '-created_at', '-pk'
+    ).values_list('pk', 'created_at')[:limit]
+    _insert_entries((
+        TimelineEntry(user_id=user_id, post_id=post_id, author_id=author_id, created_at=created_at)
+        for post_id, created_at in posts
+    ), batch_size)
+
+
+def prune_timeline(user_id, author_id):
+    """Remove an unfollowed author's posts from a user's timeline."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def _before(queryset, before, pk_field):
+    if before is None:
+        return queryset
+    created_at, pk = before
+    return queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, **{f'{pk_field}__lt': pk}))
+
+
+def feed_page(user, before=None, limit=10):
+    """Get one page of a user's feed, newest first.
+
+    ``before`` is the ``(created_at, post id)`` of the last post on the
+    previous page. Returns ``(posts, has_more)``.
+    """
+    rows = list(_before(TimelineEntry.objects.filter(user=user), before, 'post').order_by(
+        '-created_at', '-post'
+    ).values_list('created_at', 'post')[:limit + 1])
+
+    # Authors too popular to fan out, and posts published while they were, are read from the posts directly
+    followed = Follow.objects.filter(follower=user)
+    for merged in (
+        Post.objects.filter(
+            author__in=followed.filter(following__profile__follower_count__gt=fan_out_limit()).values('following')
+        ),
+        Post.objects.filter(author__in=followed.values('following'), pulled=True),
+    ):
+        rows += _before(merged.filter(status='published'), before, 'pk').order_by(
+            '-created_at', '-pk'
+        ).values_list('created_at', 'pk')[:limit + 1]
+
+    rows = sorted(set(rows), reverse=True)
+    post_ids = [post_id for _, post_id in rows[:limit]]
+    posts = Post.objects.for_list().in_bulk(post_ids)
+    return [posts[post_id] for post_id in post_ids if post_id in posts], len(rows) > limit
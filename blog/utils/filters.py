@@ -1,7 +1,10 @@
 """Filtering utilities for blog models."""
 
 import django_filters
+from rest_framework import filters
+from rest_framework.settings import api_settings
 from blog.models import Post, Category, Tag
+from .search import search_index_available, search_posts
 
 
 class PostFilter(django_filters.FilterSet):
@@ -14,4 +17,19 @@ class PostFilter(django_filters.FilterSet):
     
     class Meta:
         model = Post
-        fields = ['category', 'author', 'status', 'tag']
\ No newline at end of file
+        fields = ['category', 'author', 'status', 'tag']
+
+
+class PostSearchFilter(filters.SearchFilter):
+    """Search posts through the full-text index, falling back to icontains lookups."""
+    
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms or not search_index_available():
+            return super().filter_queryset(request, queryset, view)
+        
+        queryset = search_posts(queryset, search_terms)
+        # Rank by relevance unless the client asked for an explicit ordering
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by('search_rank', '-created_at')
+        return queryset
@@ -0,0 +1,123 @@
+"""Follow toggling, counter maintenance and batch loading for serializers."""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Value
+from blog.models import Follow, UserProfile
+from .feed import backfill_timeline, prune_timeline
+from .tasks import schedule
+
+
+FOLLOWING_CACHE_KEY = 'following_ids'
+
+
+def _adjust_follow_counts(follower, following, delta):
+    UserProfile.objects.filter(user=following).update(follower_count=F('follower_count') + delta)
+    UserProfile.objects.filter(user=follower).update(following_count=F('following_count') + delta)
+
+
+def follow_user(follower, following):
+    """Follow a user and update both profile counters atomically.
+
+    Only the counter columns are written. The followed user's recent posts
+    are backfilled into the follower's feed after commit. Returns
+    ``(follow, created)``; ``created`` is False when the user was already
+    followed.
+    """
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                follow = Follow.objects.create(follower=follower, following=following)
+        except IntegrityError:
+            # Already followed, possibly by a concurrent request that bumped the counters
+            return Follow.objects.get(follower=follower, following=following), False
+        _adjust_follow_counts(follower, following, 1)
+        schedule(backfill_timeline, follower.pk, following.pk)
+        return follow, True
+
+
+def unfollow_user(follower, following):
+    """Unfollow a user, update both counters and prune the feed atomically.
+
+    Returns whether the user was followed.
+    """
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(follower=follower, following=following).delete()
+        if deleted:
+            _adjust_follow_counts(follower, following, -1)
+            prune_timeline(follower.pk, following.pk)
+        return bool(deleted)
+
+
+def recount_follows(batch_size=500):
+    """Recompute the follower and following counters of every profile from Follow.
+
+    Profiles are processed in primary key batches with one grouped query
+    per batch. Returns the number of profiles whose counters were corrected.
+    """
+    fields = ['follower_count', 'following_count']
+    fixed = 0
+    last_pk = 0
+    while True:
+        profiles = list(
+            UserProfile.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'user_id', *fields)[:batch_size]
+        )
+        if not profiles:
+            break
+        last_pk = profiles[-1].pk
+
+        user_ids = [profile.user_id for profile in profiles]
+        followers = Follow.objects.filter(following_id__in=user_ids).order_by().values('following_id').annotate(
+            count=Count('pk'), field=Value('follower_count')
+        ).values_list('following_id', 'field', 'count')
+        following = Follow.objects.filter(follower_id__in=user_ids).order_by().values('follower_id').annotate(
+            count=Count('pk'), field=Value('following_count')
+        ).values_list('follower_id', 'field', 'count')
+        counts = {(user_id, field): count for user_id, field, count in followers.union(following, all=True)}
+
+        changed = []
+        for profile in profiles:
+            expected = {field: counts.get((profile.user_id, field), 0) for field in fields}
+            if any(getattr(profile, field) != value for field, value in expected.items()):
+                for field, value in expected.items():
+                    setattr(profile, field, value)
+                changed.append(profile)
+        if changed:
+            UserProfile.objects.bulk_update(changed, fields)
+            fixed += len(changed)
+    return fixed
+
+
+def load_following(users, user=None):
+    """Check which of ``users`` the given user follows with a single query.
+
+    Returns a dict mapping every user id to whether it is followed.
+    """
+    user_ids = [other.pk for other in users]
+    following = dict.fromkeys(user_ids, False)
+    if not user_ids or user is None or not user.is_authenticated:
+        return following
+
+    followed = Follow.objects.filter(follower=user, following_id__in=user_ids).values_list(
+        'following_id', flat=True
+    )
+    following.update(dict.fromkeys(followed, True))
+    return following
+
+
+def prime_following_cache(context, users):
+    """Store whether the request user follows each of ``users`` in a serializer context.
+
+    Users already present in the cache are skipped, so nested serializers
+    sharing the same context only load each user once per request.
+    """
+    cache = context.setdefault(FOLLOWING_CACHE_KEY, {})
+    missing = [other for other in users if other.pk not in cache]
+    if missing:
+        request = context.get('request')
+        cache.update(load_following(missing, getattr(request, 'user', None)))
+    return cache
+
+
+def get_cached_following(context, user):
+    """Check whether the request user follows ``user``, loading it if not primed."""
+    return prime_following_cache(context, [user])[user.pk]
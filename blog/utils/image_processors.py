@@ -1,77 +1,131 @@
-"""Image processing utilities."""
+"""Image processing utilities.
 
-from imagekit import ImageSpec, register
-from imagekit.processors import ResizeToFill, ResizeToFit
+This is the single registry of image renditions. The rendition endpoint,
+the background worker and the backfill look them up by name in
+``RENDITIONS``. Renditions carry no EXIF or XMP
+metadata and JPEGs are written optimized; larger ones are also progressive
+(below about 10 KB progressive encoding costs more bytes than it saves).
+"""
+
+from functools import lru_cache
+from imagekit import ImageSpec
+from imagekit import hashers
+from imagekit.processors import ResizeToFill
+from PIL import features
 from pilkit.processors import Transpose
 
 
-@register.generator('blog:avatar_thumbnail')
+class StripMetadata:
+    """Drop EXIF, XMP and other metadata, keeping only the colour profile."""
+    
+    def process(self, img):
+        icc_profile = img.info.get('icc_profile')
+        img.info = {'icc_profile': icc_profile} if icc_profile else {}
+        return img
+
+
 class AvatarThumbnail(ImageSpec):
     """Generate avatar thumbnail (150x150)."""
     
     processors = [
         Transpose(),
-        ResizeToFill(150, 150)
+        ResizeToFill(150, 150),
+        StripMetadata()
     ]
     format = 'JPEG'
-    options = {'quality': 85}
+    options = {'quality': 85, 'optimize': True}
 
 
-@register.generator('blog:avatar_small')
 class AvatarSmall(ImageSpec):
     """Generate small avatar (50x50)."""
     
     processors = [
         Transpose(),
-        ResizeToFill(50, 50)
+        ResizeToFill(50, 50),
+        StripMetadata()
     ]
     format = 'JPEG'
-    options = {'quality': 80}
+    options = {'quality': 80, 'optimize': True}
 
 
-@register.generator('blog:featured_image_large')
 class FeaturedImageLarge(ImageSpec):
     """Generate large featured image (800x400)."""
     
     processors = [
         Transpose(),
-        ResizeToFit(800, 400)
+        ResizeToFill(800, 400),
+        StripMetadata()
     ]
     format = 'JPEG'
-    options = {'quality': 85}
+    options = {'quality': 85, 'optimize': True, 'progressive': True}
 
 
-@register.generator('blog:featured_image_medium')
 class FeaturedImageMedium(ImageSpec):
     """Generate medium featured image (400x200)."""
     
     processors = [
         Transpose(),
-        ResizeToFit(400, 200)
+        ResizeToFill(400, 200),
+        StripMetadata()
     ]
     format = 'JPEG'
-    options = {'quality': 80}
+    options = {'quality': 80, 'optimize': True, 'progressive': True}
 
 
-@register.generator('blog:featured_image_small')
 class FeaturedImageSmall(ImageSpec):
     """Generate small featured image (200x100)."""
     
     processors = [
         Transpose(),
-        ResizeToFit(200, 100)
+        ResizeToFill(200, 100),
+        StripMetadata()
     ]
     format = 'JPEG'
-    options = {'quality': 75}
+    options = {'quality': 75, 'optimize': True}
 
 
-@register.generator('blog:featured_image_webp')
-class FeaturedImageWebP(ImageSpec):
-    """Generate WebP version of featured image."""
-    
-    processors = [
-        Transpose(),
-        ResizeToFit(800, 400)
-    ]
-    format = 'WEBP'
-    options = {'quality': 80}
\ No newline at end of file
+# Renditions by name, as used in /media/r/<name>/ URLs
+RENDITIONS = {
+    'avatar_thumbnail': AvatarThumbnail,
+    'avatar_small': AvatarSmall,
+    'featured_image_large': FeaturedImageLarge,
+    'featured_image_medium': FeaturedImageMedium,
+    'featured_image_small': FeaturedImageSmall,
+}
+
+# Source image fields and the renditions generated from each
+RENDITION_SOURCES = {
+    'featured_image': ('blog.Post', [
+        'featured_image_large', 'featured_image_medium', 'featured_image_small',
+    ]),
+    'avatar': ('blog.UserProfile', ['avatar_thumbnail', 'avatar_small']),
+}
+
+
+# Formats renditions can be negotiated into, most preferred first
+DELIVERY_FORMATS = [fmt for fmt in ('AVIF', 'WEBP') if features.check(fmt.lower())]
+
+# Encoder settings when a rendition is delivered in another format. AVIF
+# uses its own quality scale, where 60 looks like JPEG at 85.
+FORMAT_OPTIONS = {
+    'JPEG': {'optimize': True, 'progressive': True},
+    'WEBP': {'method': 6},
+    'AVIF': {'quality': 60, 'speed': 6},
+}
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp', 'AVIF': 'image/avif'}
+
+
+def rendition_encoding(name, image_format=None):
+    """Get the format and encoder options of a named rendition, optionally delivered in another format."""
+    spec = RENDITIONS[name]
+    if image_format in (None, spec.format):
+        return spec.format, dict(spec.options)
+    return image_format, {'quality': spec.options.get('quality', 80), **FORMAT_OPTIONS[image_format]}
+
+
+@lru_cache(maxsize=None)
+def rendition_fingerprint(name, image_format=None):
+    """Hash a rendition's processing and encoding settings, independent of any source."""
+    spec = RENDITIONS[name]
+    return hashers.pickle([spec.processors, rendition_encoding(name, image_format), spec.autoconvert])[:12]
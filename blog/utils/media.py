@@ -0,0 +1,122 @@
+"""Deduplication and reference counting of uploaded images.
+
+Uploads are hashed while they stream in, so ``blog.storage`` can store each
+content once. ``StoredFile.ref_count`` follows the posts and profiles
+referring to a file; ``cleanup_stored_files`` deletes files nobody refers
+to any more, together with their renditions.
+"""
+
+import hashlib
+from collections import Counter
+from datetime import timedelta
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from blog.models import ImageUpload, Post, StoredFile, UserProfile
+from blog.storage import file_digest, image_storage
+from .renditions import discard_renditions
+
+
+# Models with an uploaded image and the field holding it
+IMAGE_FIELDS = {Post: 'featured_image', UserProfile: 'avatar'}
+
+
+class HashingUploadMixin:
+    """Compute the SHA-256 of an uploaded file while its chunks are received."""
+
+    def new_file(self, *args, **kwargs):
+        # Set up first: the in-memory handler ends new_file by raising StopFutureHandlers
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        remaining = super().receive_data_chunk(raw_data, start)
+        if remaining is None:
+            # This handler consumed the chunk, so it is the one building the file
+            self.hasher.update(raw_data)
+        return remaining
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.hasher.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    """In-memory upload handler that hashes the upload as it arrives."""
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    """Temporary file upload handler that hashes the upload as it arrives."""
+
+
+def retain_file(name):
+    """Count a new reference to a stored file."""
+    if not name:
+        return
+    if not StoredFile.objects.filter(name=name).update(ref_count=F('ref_count') + 1):
+        StoredFile.objects.get_or_create(name=name, defaults={'ref_count': 1})
+
+
+def release_file(name):
+    """Drop a reference to a stored file; unreferenced files are removed by cleanup."""
+    if name:
+        StoredFile.objects.filter(name=name).update(ref_count=F('ref_count') - 1, updated_at=timezone.now())
+
+
+def recount_stored_files():
+    """Recompute every ``StoredFile.ref_count`` in one UPDATE. Returns the rows updated."""
+    ref_count = Value(0)
+    for model, field in IMAGE_FIELDS.items():
+        references = model.objects.filter(**{field: OuterRef('name')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count')
+        ref_count = ref_count + Coalesce(Subquery(references), Value(0))
+    return StoredFile.objects.update(ref_count=ref_count)
+
+
+def cleanup_stored_files(grace_period=3600):
+    """Delete stored files without references, and their renditions.
+
+    Only files unreferenced for ``grace_period`` seconds are removed, so
+    uploads whose post or profile is still being saved are kept. Names
+    still referenced (a drifted counter) or held by a completed chunked
+    upload are skipped. Returns the number of files deleted and the bytes
+    freed.
+    """
+    cutoff = timezone.now() - timedelta(seconds=grace_period)
+    orphans = list(StoredFile.objects.filter(ref_count__lte=0, updated_at__lt=cutoff))
+    names = [stored.name for stored in orphans]
+    referenced = set()
+    for model, field in IMAGE_FIELDS.items():
+        referenced.update(model.objects.filter(**{f'{field}__in': names}).values_list(field, flat=True))
+    # Completed chunked uploads waiting to be attached to a post
+    referenced.update(ImageUpload.objects.filter(stored_name__in=names).values_list('stored_name', flat=True))
+
+    deleted = Counter()
+    for stored in orphans:
+        if stored.name in referenced:
+            continue
+        with transaction.atomic():
+            # Recheck under the row lock: saving the same content again locks and
+            # touches the row before reusing the file, so it waits for this delete
+            stored = StoredFile.objects.select_for_update().filter(
+                pk=stored.pk, ref_count__lte=0, updated_at__lt=cutoff
+            ).first()
+            if stored is None:
+                continue
+            digest, size = stored.digest, stored.size
+            if image_storage.exists(stored.name):
+                size = image_storage.size(stored.name)
+                if not digest:
+                    with image_storage.open(stored.name) as content:
+                        digest = file_digest(content)
+                image_storage.delete(stored.name)
+            discard_renditions(stored.name, digest)
+            stored.delete()
+        deleted['files'] += 1
+        deleted['bytes'] += size
+    return deleted['files'], deleted['bytes']
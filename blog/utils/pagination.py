@@ -0,0 +1,184 @@
+"""Pagination classes for blog listings."""
+
+import base64
+import binascii
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from blog.models import Post
+from .feed import feed_page
+
+
+def build_cursor_url(url, ordering, obj, reverse=False, cursor_query_param='cursor'):
+    """Build a ``KeysetPagination`` URL for the page after (or before) ``obj``."""
+    value = getattr(obj, ordering.lstrip('-'))
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    payload = json.dumps({'o': ordering, 'v': value, 'k': obj.pk, 'r': reverse})
+    encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+    url = remove_query_param(url, 'page')
+    return replace_query_param(url, cursor_query_param, encoded)
+
+
+class KeysetPagination(BasePagination):
+    """Opaque cursor pagination on ``(ordering field, pk)`` without COUNT or OFFSET.
+
+    The ordering field is taken from the queryset, so it follows whatever
+    ``OrderingFilter`` or the model's default ordering applied. Cursors are
+    tied to that field and rejected if the ordering changes between pages.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request, queryset)
+
+        name = self.ordering.lstrip('-')
+        reverse = cursor['r'] if cursor else False
+        descending = self.ordering.startswith('-') != reverse
+        if descending:
+            queryset = queryset.order_by(f'-{name}', '-pk')
+        else:
+            queryset = queryset.order_by(name, 'pk')
+
+        if cursor:
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{name}__{lookup}': cursor['v']}) |
+                Q(**{name: cursor['v'], f'pk__{lookup}': cursor['k']})
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = bool(self.page), has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None and bool(self.page)
+        return self.page
+
+    def get_ordering(self, queryset):
+        """Get the single field the cursor is keyed on, with direction prefix."""
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        if ordering and isinstance(ordering[0], str) and ordering[0] not in ('?', '-?'):
+            return ordering[0]
+        return '-pk'
+
+    def get_ordering_field(self, queryset):
+        """Get the field behind the ordering: an annotation's output field or a model field across relations."""
+        name = self.ordering.lstrip('-')
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        model, field = queryset.model, None
+        for part in name.split('__'):
+            field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+            model = field.related_model or model
+        return field
+
+    def decode_cursor(self, request, queryset):
+        """Decode the cursor query parameter, or return None on the first page.
+
+        The value and primary key are converted with their fields, so a
+        tampered cursor is rejected instead of failing in the query.
+        """
+        model = queryset.model
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if cursor['o'] != self.ordering or not {'v', 'k', 'r'} <= cursor.keys():
+                raise ValueError
+            if not isinstance(cursor['r'], bool):
+                raise ValueError
+            cursor['v'] = self.get_ordering_field(queryset).to_python(cursor['v'])
+            cursor['k'] = model._meta.pk.to_python(cursor['k'])
+            if cursor['v'] is None or cursor['k'] is None:
+                raise ValueError
+        except (
+            TypeError, ValueError, KeyError, AttributeError, UnicodeEncodeError, binascii.Error,
+            ValidationError, FieldDoesNotExist,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, obj, reverse):
+        """Build the URL pointing past ``obj`` in the given direction."""
+        return build_cursor_url(self.base_url, self.ordering, obj, reverse, self.cursor_query_param)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class FeedPagination(KeysetPagination):
+    """Forward-only cursors over a user's home feed, newest first.
+
+    Pages come from ``feed_page``, which merges the timeline with posts of
+    authors too popular to fan out, so there is no previous link.
+    """
+
+    ordering = '-created_at'
+
+    def paginate_feed(self, user, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request, Post.objects.all())
+        if cursor and cursor['r']:
+            raise NotFound(self.invalid_cursor_message)
+        before = (cursor['v'], cursor['k']) if cursor else None
+        self.page, self.has_next = feed_page(user, before, self.page_size)
+        self.has_previous = False
+        return self.page
+
+
+class BlogPagination(PageNumberPagination):
+    """Page number pagination with opt-in keyset cursors.
+
+    Requests carrying ``?pagination=cursor`` or a ``cursor`` parameter are
+    paginated by ``KeysetPagination``; everything else keeps page numbers.
+    """
+
+    cursor_pagination_class = KeysetPagination
+
+    def use_cursor(self, request):
+        """Check whether the client opted into cursor pagination."""
+        params = request.query_params
+        return params.get('pagination') == 'cursor' or self.cursor_pagination_class.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            self.display_page_controls = False
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,115 @@
+"""Reaction toggling, counter maintenance and batch loading for serializers."""
+
+from collections import defaultdict
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from blog.models import Post, Reaction
+
+
+REACTION_CACHE_KEY = 'reaction_summary'
+
+
+def toggle_reaction(user, post, reaction_type):
+    """Add or remove a reaction and update the post counter atomically.
+
+    Tries the delete first; only when nothing was deleted is the reaction
+    inserted. Returns ``(reaction, added)`` where ``reaction`` is None
+    when an existing reaction was removed.
+    """
+    counter = Reaction.counter_field(reaction_type)
+    with transaction.atomic():
+        deleted, _ = Reaction.objects.filter(
+            user=user, post=post, reaction_type=reaction_type
+        ).delete()
+        if deleted:
+            Post.objects.filter(pk=post.pk).update(**{counter: F(counter) - 1}, interactions_changed_at=timezone.now())
+            return None, False
+
+        try:
+            with transaction.atomic():
+                reaction = Reaction.objects.create(
+                    user=user, post=post, reaction_type=reaction_type
+                )
+        except IntegrityError:
+            # A concurrent request already added it and bumped the counter.
+            reaction = Reaction.objects.get(user=user, post=post, reaction_type=reaction_type)
+            return reaction, True
+
+        Post.objects.filter(pk=post.pk).update(**{counter: F(counter) + 1}, interactions_changed_at=timezone.now())
+        return reaction, True
+
+
+def recount_reactions(batch_size=500):
+    """Recompute the reaction counters of every post from the Reaction table.
+
+    Posts are processed in primary key batches with one grouped query per
+    batch. Returns the number of posts whose counters were corrected.
+    """
+    fields = [Reaction.counter_field(reaction_type) for reaction_type, _ in Reaction.REACTION_CHOICES]
+    fixed = 0
+    last_pk = 0
+    while True:
+        posts = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', *fields)[:batch_size]
+        )
+        if not posts:
+            break
+        last_pk = posts[-1].pk
+
+        counts = defaultdict(dict)
+        rows = Reaction.objects.filter(post__in=posts).values(
+            'post_id', 'reaction_type'
+        ).annotate(count=Count('id')).order_by()
+        for row in rows:
+            counts[row['post_id']][Reaction.counter_field(row['reaction_type'])] = row['count']
+
+        changed = []
+        for post in posts:
+            expected = counts.get(post.pk, {})
+            if any(getattr(post, field) != expected.get(field, 0) for field in fields):
+                for field in fields:
+                    setattr(post, field, expected.get(field, 0))
+                changed.append(post)
+        if changed:
+            Post.objects.bulk_update(changed, fields)
+            fixed += len(changed)
+    return fixed
+
+
+def load_user_reactions(posts, user=None):
+    """Load the user's reactions for many posts with a single query.
+
+    Returns a dict mapping every post id to a list of reaction types.
+    """
+    post_ids = [post.pk for post in posts]
+    user_reactions = {post_id: [] for post_id in post_ids}
+    if not post_ids or user is None or not user.is_authenticated:
+        return user_reactions
+
+    rows = Reaction.objects.filter(user=user, post_id__in=post_ids).values_list(
+        'post_id', 'reaction_type'
+    ).order_by('-created_at')
+    for post_id, reaction_type in rows:
+        user_reactions[post_id].append(reaction_type)
+    return user_reactions
+
+
+def prime_reaction_cache(context, posts):
+    """Store the user's reactions for ``posts`` in a serializer context.
+
+    Posts already present in the cache are skipped, so nested serializers
+    sharing the same context only load each post once per request.
+    """
+    cache = context.setdefault(REACTION_CACHE_KEY, {})
+    missing = [post for post in posts if post.pk not in cache]
+    if missing:
+        request = context.get('request')
+        user = getattr(request, 'user', None)
+        cache.update(load_user_reactions(missing, user))
+    return cache
+
+
+def get_cached_reactions(context, post):
+    """Get the user's reactions for one post, loading them if not primed."""
+    return prime_reaction_cache(context, [post])[post.pk]
@@ -0,0 +1,163 @@
+"""Item-to-item "readers also liked" recommendations.
+
+``compute_also_liked`` builds a binary user x post matrix from reactions
+and reading lists (whether a user interacted with a post at all) and
+scores post pairs by cosine similarity: shared readers divided by the
+geometric mean of both posts' reader counts. Similarities are computed
+``chunk_size`` posts at a time, so only that block of the post x post
+matrix is in memory, and the top N neighbours of each post are stored as
+a ``RelatedPosts`` row.
+
+An incremental run recomputes only posts whose interactions changed since
+the previous run, plus posts sharing a reader with them and posts whose
+stored neighbours include them (a removed interaction leaves no shared
+reader behind): no other pair's similarity can have moved. NumPy and SciPy are optional, as for follow
+suggestions.
+"""
+
+import math
+import time
+from collections import Counter, defaultdict
+from itertools import islice
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from blog.models import Post, Reaction, ReadingList, RelatedPosts
+from .cache import invalidate_post_responses
+from .vectorize import np, rank_top, sparse, top_candidates, vectorized_available
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_memory_mb():
+    """Get the process's peak resident memory in MB, or None where unsupported."""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def load_interactions():
+    """Load the distinct ``(user id, post id)`` pairs of published posts."""
+    pairs = set()
+    for model in (Reaction, ReadingList):
+        pairs.update(
+            model.objects.filter(post__status='published').order_by().values_list('user_id', 'post_id')
+            .distinct().iterator(chunk_size=10000)
+        )
+    return pairs
+
+
+def _vectorized_neighbours(pairs, targets, top_n, chunk_size):
+    pairs = np.array(sorted(pairs), dtype=np.int64).reshape(-1, 2)
+    user_ids, user_index = np.unique(pairs[:, 0], return_inverse=True)
+    post_ids, post_index = np.unique(pairs[:, 1], return_inverse=True)
+    readers = sparse.csr_matrix(
+        (np.ones(len(pairs)), (post_index, user_index)), shape=(len(post_ids), len(user_ids))
+    )
+    inverse_norms = 1 / np.sqrt(np.asarray(readers.sum(axis=1)).ravel())
+    read_by = readers.T.tocsr()
+    positions = np.searchsorted(post_ids, sorted(targets))
+
+    for start in range(0, len(positions), chunk_size):
+        block = positions[start:start + chunk_size]
+        similarity = sparse.diags(inverse_norms[block]) @ (readers[block] @ read_by) @ sparse.diags(inverse_norms)
+        similarity = similarity.tocsr()
+        for row, position in enumerate(block):
+            low, high = similarity.indptr[row], similarity.indptr[row + 1]
+            data, columns = similarity.data[low:high], similarity.indices[low:high]
+            keep = columns != position
+            data, columns = top_candidates(data[keep], columns[keep], top_n)
+            yield int(post_ids[position]), rank_top(zip(post_ids[columns].tolist(), data.tolist()), top_n)
+
+
+def _python_neighbours(pairs, targets, top_n):
+    post_readers = defaultdict(set)
+    user_posts = defaultdict(set)
+    for user_id, post_id in pairs:
+        post_readers[post_id].add(user_id)
+        user_posts[user_id].add(post_id)
+
+    for post_id in sorted(targets):
+        shared = Counter()
+        for user_id in post_readers[post_id]:
+            shared.update(user_posts[user_id])
+        shared.pop(post_id, None)
+        yield post_id, rank_top((
+            (other_id, count / math.sqrt(len(post_readers[post_id]) * len(post_readers[other_id])))
+            for other_id, count in shared.items()
+        ), top_n)
+
+
+def _affected_posts(pairs, changed, stored):
+    readers = {user_id for user_id, post_id in pairs if post_id in changed}
+    affected = {post_id for user_id, post_id in pairs if post_id in changed or user_id in readers}
+    # Neighbours that only shared a since removed reader are found through their stored rows
+    posts = {post_id for _, post_id in pairs}
+    for post_id, neighbours in stored.values_list('post_id', 'neighbours').iterator(chunk_size=2000):
+        if post_id in posts and any(other_id in changed for other_id, _ in neighbours):
+            affected.add(post_id)
+    return affected
+
+
+def compute_also_liked(top_n=10, chunk_size=500, incremental=False, batch_size=1000):
+    """Recompute and store the "readers also liked" neighbours of posts.
+
+    With ``incremental`` only posts affected by interactions changed since
+    the last run are recomputed (everything, if there was no run yet).
+    Returns a dict of stats including the runtime and peak memory.
+    """
+    started_at = timezone.now()
+    started = time.monotonic()
+    stored = RelatedPosts.objects.filter(kind='also_liked')
+    since = stored.aggregate(last=Max('computed_at'))['last'] if incremental else None
+
+    pairs = load_interactions()
+    if since is None:
+        changed = None
+        targets = {post_id for _, post_id in pairs}
+    else:
+        changed = set(Post.objects.filter(interactions_changed_at__gte=since).values_list('pk', flat=True))
+        targets = _affected_posts(pairs, changed, stored)
+
+    if vectorized_available() and targets:
+        neighbours = _vectorized_neighbours(pairs, targets, top_n, chunk_size)
+    else:
+        neighbours = _python_neighbours(pairs, targets, top_n)
+    rows = (
+        RelatedPosts(post_id=post_id, kind='also_liked', neighbours=ranked, computed_at=started_at)
+        for post_id, ranked in neighbours if ranked
+    )
+
+    written = []
+    with transaction.atomic():
+        # Changed posts may have lost every interaction, so drop their rows too
+        (stored if changed is None else stored.filter(post_id__in=targets | changed)).delete()
+        while batch := list(islice(rows, batch_size)):
+            RelatedPosts.objects.bulk_create(batch)
+            written += [row.post_id for row in batch]
+    invalidate_post_responses(*Post.objects.filter(pk__in=written).values_list('slug', flat=True))
+
+    return {
+        'interactions': len(pairs),
+        'posts': len(targets),
+        'stored': len(written),
+        'incremental': changed is not None,
+        'vectorized': vectorized_available(),
+        'seconds': round(time.monotonic() - started, 2),
+        'peak_memory_mb': peak_memory_mb(),
+    }
+
+
+def get_related_posts(post, kind):
+    """Get a post's stored neighbours as ``(post, score)`` pairs, published posts only."""
+    neighbours = RelatedPosts.objects.filter(post=post, kind=kind).values_list('neighbours', flat=True).first()
+    if not neighbours:
+        return []
+    posts = Post.objects.filter(status='published').only('id', 'title', 'slug').in_bulk(
+        [post_id for post_id, _ in neighbours]
+    )
+    return [(posts[post_id], score) for post_id, score in neighbours if post_id in posts]
@@ -0,0 +1,399 @@
+"""Content-based related posts from tag overlap and TF-IDF.
+
+Every published post has a ``PostVector``: the words of its title and
+content hashed into ``TERM_BUCKETS`` term ids (so no vocabulary table is
+kept) with ``1 + log(tf)`` weights, title words counting ``TITLE_WEIGHT``
+times, plus its tag ids, all packed as raw machine arrays. Two posts score
+
+    (1 - TAG_WEIGHT) * cosine(TF-IDF vectors) + TAG_WEIGHT * cosine(tag sets)
+
+with IDF taken from the stored vectors, and the top K of each post are
+stored as a ``RelatedPosts`` row of kind ``content``.
+
+``compute_related_posts`` rebuilds all vectors and rows. Between runs,
+saving a post refreshes its vector and row in the background: only the
+saved posts are scored, against the stored vectors streamed in chunks,
+and only the rows of posts sharing a term or tag with them are read. The
+saved posts are slotted into, or taken out of, those rows; a row is only
+rescored when a post falling in it may have made room for one not
+stored, and only rows whose ranking changed are written. Rows are
+upserted, so concurrent refreshes cannot collide. Scores of other pairs
+drift a little as document frequencies change until the next full run.
+NumPy and SciPy are optional, as for follow suggestions.
+"""
+
+import math
+import re
+import time
+import zlib
+from array import array
+from collections import Counter, defaultdict
+from itertools import islice
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.html import strip_tags
+from blog.models import Post, PostVector, RelatedPosts
+from .cache import invalidate_post_responses
+from .recommendations import peak_memory_mb
+from .vectorize import np, rank_top, sparse, top_candidates, vectorized_available
+
+
+TERM_BUCKETS = 2 ** 20
+TITLE_WEIGHT = 2
+TAG_WEIGHT = 0.3
+MIN_WORD_LENGTH = 3
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+STOP_WORDS = frozenset('''
+    about above after again against all also and any are because been before being below between both but can
+    could did does doing down during each few for from further had has have having her here hers herself him
+    himself his how into its itself just more most not now off once only other our ours ourselves out over own
+    same she should some such than that the their theirs them themselves then there these they this those
+    through too under until very was were what when where which while who whom why will with would you your
+    yours yourself yourselves
+'''.split())
+
+def related_top_k():
+    """Get the number of content neighbours stored per post."""
+    return getattr(settings, 'RELATED_POSTS_TOP_K', 10)
+
+
+def tokenize(text):
+    """Split text into lowercase words, dropping markup, short words and stop words."""
+    return [
+        word for word in WORD_RE.findall(strip_tags(text).lower())
+        if len(word) >= MIN_WORD_LENGTH and word not in STOP_WORDS
+    ]
+
+
+def _term_id(word):
+    return zlib.crc32(word.encode()) % TERM_BUCKETS
+
+
+def build_vector(post, tag_ids):
+    """Build the unsaved ``PostVector`` of a post from its title, content and tag ids."""
+    counts = Counter()
+    for word in tokenize(post.title):
+        counts[_term_id(word)] += TITLE_WEIGHT
+    for word in tokenize(post.content):
+        counts[_term_id(word)] += 1
+    terms = sorted(counts)
+    return PostVector(
+        post_id=post.pk,
+        terms=array('I', terms).tobytes(),
+        weights=array('f', (1 + math.log(counts[term]) for term in terms)).tobytes(),
+        tags=array('I', sorted(tag_ids)).tobytes(),
+    )
+
+
+def _unpack(code, data):
+    values = array(code)
+    values.frombytes(data)
+    return values
+
+
+def _unpack_vector(terms, weights, tags):
+    return _unpack('I', terms), _unpack('f', weights), _unpack('I', tags)
+
+
+def _stream_vectors(exclude=(), chunk_size=2000):
+    """Yield the vectors of published posts not in ``exclude`` as lists of ``(post id, vector)``."""
+    rows = PostVector.objects.filter(post__status='published').exclude(post_id__in=exclude).values_list(
+        'post_id', 'terms', 'weights', 'tags'
+    ).iterator(chunk_size=chunk_size)
+    while batch := list(islice(rows, chunk_size)):
+        yield [(post_id, _unpack_vector(*packed)) for post_id, *packed in batch]
+
+
+def _load_tag_ids(post_ids):
+    tag_ids = defaultdict(list)
+    for post_id, tag_id in Post.tags.through.objects.filter(post_id__in=post_ids).values_list('post_id', 'tag_id'):
+        tag_ids[post_id].append(tag_id)
+    return tag_ids
+
+
+def _normalized(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    scale = np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)
+    return (sparse.diags(scale) @ matrix).tocsr()
+
+
+def _vectorized_rows(vectors, targets, chunk_size):
+    post_ids = np.array(sorted(vectors), dtype=np.int64)
+    count = len(post_ids)
+    packed = [vectors[post_id] for post_id in post_ids.tolist()]
+
+    term_lists, weight_lists, tag_lists = zip(*packed)
+    terms = np.concatenate([np.frombuffer(values, dtype=np.uint32) for values in term_lists])
+    weights = np.concatenate([np.frombuffer(values, dtype=np.float32) for values in weight_lists])
+    term_rows = np.repeat(np.arange(count), [len(values) for values in term_lists])
+    term_ids, columns = np.unique(terms, return_inverse=True)
+    idf = np.log((1 + count) / (1 + np.bincount(columns, minlength=len(term_ids)))) + 1
+    text = _normalized(sparse.csr_matrix(
+        (weights.astype(np.float64) * idf[columns], (term_rows, columns)), shape=(count, len(term_ids))
+    ))
+
+    tags = np.concatenate([np.frombuffer(values, dtype=np.uint32) for values in tag_lists])
+    tag_rows = np.repeat(np.arange(count), [len(values) for values in tag_lists])
+    tag_ids, tag_columns = np.unique(tags, return_inverse=True)
+    tagged = _normalized(sparse.csr_matrix(
+        (np.ones(len(tags)), (tag_rows, tag_columns)), shape=(count, len(tag_ids))
+    ))
+
+    text_by_term, tagged_by_tag = text.T.tocsr(), tagged.T.tocsr()
+    positions = np.searchsorted(post_ids, sorted(targets))
+    for start in range(0, len(positions), chunk_size):
+        block = positions[start:start + chunk_size]
+        similarity = (
+            (1 - TAG_WEIGHT) * (text[block] @ text_by_term) + TAG_WEIGHT * (tagged[block] @ tagged_by_tag)
+        ).tocsr()
+        for row, position in enumerate(block):
+            low, high = similarity.indptr[row], similarity.indptr[row + 1]
+            data, columns = similarity.data[low:high], similarity.indices[low:high]
+            keep = columns != position
+            yield int(post_ids[position]), post_ids[columns[keep]], data[keep]
+
+
+def _vectorized_neighbours(vectors, targets, top_k, chunk_size):
+    for post_id, other_ids, data in _vectorized_rows(vectors, targets, chunk_size):
+        data, other_ids = top_candidates(data, other_ids, top_k)
+        yield post_id, rank_top(zip(other_ids.tolist(), data.tolist()), top_k)
+
+
+def _unit(terms, weights, document_frequency, count):
+    weighted = [
+        (term, weight * (math.log((1 + count) / (1 + document_frequency[term])) + 1))
+        for term, weight in zip(terms, weights)
+    ]
+    norm = math.sqrt(sum(value * value for _, value in weighted))
+    return [(term, value / norm) for term, value in weighted] if norm else []
+
+
+def _python_rows(vectors, targets):
+    count = len(vectors)
+    document_frequency = Counter()
+    for terms, _, _ in vectors.values():
+        document_frequency.update(terms)
+
+    units = {}
+    postings = defaultdict(list)
+    tagged = defaultdict(list)
+    for post_id, (terms, weights, tags) in vectors.items():
+        units[post_id] = _unit(terms, weights, document_frequency, count)
+        for term, value in units[post_id]:
+            postings[term].append((post_id, value))
+        for tag_id in tags:
+            tagged[tag_id].append(post_id)
+
+    for post_id in sorted(targets):
+        text = defaultdict(float)
+        for term, value in units[post_id]:
+            for other_id, other_value in postings[term]:
+                text[other_id] += value * other_value
+        tags = vectors[post_id][2]
+        shared = Counter()
+        for tag_id in tags:
+            shared.update(tagged[tag_id])
+
+        scores = defaultdict(float)
+        for other_id, similarity in text.items():
+            scores[other_id] += (1 - TAG_WEIGHT) * similarity
+        for other_id, shared_count in shared.items():
+            scores[other_id] += TAG_WEIGHT * shared_count / math.sqrt(len(tags) * len(vectors[other_id][2]))
+        scores.pop(post_id, None)
+        yield post_id, scores
+
+
+def _python_neighbours(vectors, targets, top_k):
+    for post_id, scores in _python_rows(vectors, targets):
+        yield post_id, rank_top(scores.items(), top_k)
+
+
+def _neighbours(vectors, targets, top_k, chunk_size=500):
+    if vectorized_available() and targets:
+        return _vectorized_neighbours(vectors, targets, top_k, chunk_size)
+    return _python_neighbours(vectors, targets, top_k)
+
+
+def _score_against(targets, chunks, document_frequency, count, touching=()):
+    """Score target vectors against streamed vectors as ``{target: {post id: score}}``.
+
+    Also returns the ids of streamed posts sharing a term or tag with any
+    of the ``touching`` vectors.
+    """
+    postings = defaultdict(list)
+    tagged = defaultdict(list)
+    for post_id, (terms, weights, tags) in targets.items():
+        for term, value in _unit(terms, weights, document_frequency, count):
+            postings[term].append((post_id, value))
+        for tag_id in tags:
+            tagged[tag_id].append(post_id)
+    touched_terms = {term for terms, _, _ in touching for term in terms}
+    touched_tags = {tag_id for _, _, tags in touching for tag_id in tags}
+
+    text = {post_id: defaultdict(float) for post_id in targets}
+    shared = {post_id: Counter() for post_id in targets}
+    counts = {}
+    touched = set()
+    for chunk in chunks:
+        for other_id, (terms, weights, tags) in chunk:
+            if any(term in postings for term in terms):
+                for term, value in _unit(terms, weights, document_frequency, count):
+                    for post_id, target_value in postings.get(term, ()):
+                        text[post_id][other_id] += value * target_value
+            if any(tag_id in tagged for tag_id in tags):
+                counts[other_id] = len(tags)
+                for tag_id in tags:
+                    for post_id in tagged.get(tag_id, ()):
+                        shared[post_id][other_id] += 1
+            if touched_terms.intersection(terms) or touched_tags.intersection(tags):
+                touched.add(other_id)
+
+    scores = {}
+    for post_id, (_, _, tags) in targets.items():
+        scores[post_id] = row = defaultdict(float)
+        for other_id, similarity in text[post_id].items():
+            row[other_id] += (1 - TAG_WEIGHT) * similarity
+        for other_id, shared_count in shared[post_id].items():
+            row[other_id] += TAG_WEIGHT * shared_count / math.sqrt(len(tags) * counts[other_id])
+        row.pop(post_id, None)
+    return scores, touched
+
+
+def _create_rows(rows, computed_at, batch_size):
+    created = (
+        RelatedPosts(post_id=post_id, kind='content', neighbours=ranked, computed_at=computed_at)
+        for post_id, ranked in rows.items() if ranked
+    )
+    while batch := list(islice(created, batch_size)):
+        RelatedPosts.objects.bulk_create(
+            batch, update_conflicts=True, unique_fields=['post', 'kind'], update_fields=['neighbours', 'computed_at']
+        )
+
+
+def update_post_vectors(post_ids, top_k=None, batch_size=1000):
+    """Refresh the vectors and content neighbours of saved, unpublished or deleted posts.
+
+    The posts' own rows are recomputed, other rows gain or lose them as
+    their new scores dictate, and full rows where one of them fell are
+    rescored. Returns the ids of posts whose rows changed.
+    """
+    if top_k is None:
+        top_k = related_top_k()
+    changed = set(post_ids)
+    posts = Post.objects.filter(pk__in=changed, status='published').only('pk', 'title', 'content')
+    tag_ids = _load_tag_ids(changed)
+    new_vectors = [build_vector(post, tag_ids[post.pk]) for post in posts]
+    vectors = {vector.post_id: _unpack_vector(vector.terms, vector.weights, vector.tags) for vector in new_vectors}
+    old_vectors = [
+        _unpack_vector(*packed)
+        for packed in PostVector.objects.filter(post_id__in=changed).values_list('terms', 'weights', 'tags')
+    ]
+
+    def corpus():
+        yield from _stream_vectors(exclude=changed)
+        yield list(vectors.items())
+
+    document_frequency = Counter()
+    count = 0
+    for chunk in corpus():
+        count += len(chunk)
+        for _, (terms, _, _) in chunk:
+            document_frequency.update(terms)
+
+    # Only posts sharing a term or tag with a changed post, before or after, can list it
+    scores, touched = _score_against(vectors, corpus(), document_frequency, count, touching=old_vectors)
+    rows = {post_id: rank_top(scores[post_id].items(), top_k) for post_id in vectors}
+    incoming = defaultdict(list)
+    for post_id, row in scores.items():
+        for other_id, score in row.items():
+            if other_id not in changed:
+                incoming[other_id].append((post_id, score))
+
+    stored = dict(RelatedPosts.objects.filter(
+        kind='content', post_id__in=changed | touched | incoming.keys()
+    ).values_list('post_id', 'neighbours'))
+    rescore = set()
+    for other_id in (stored.keys() | incoming.keys()) - changed:
+        before = stored.get(other_id, [])
+        ranked = rank_top([item for item in before if item[0] not in changed] + incoming[other_id], top_k)
+        listed = dict(ranked)
+        if len(before) >= top_k and any(
+            post_id in changed and listed.get(post_id, 0) < score for post_id, score in before
+        ):
+            # A changed post fell in or out of a full row, so a post not stored may now outrank it
+            rescore.add(other_id)
+        else:
+            rows[other_id] = ranked
+    if rescore:
+        rescored = {
+            post_id: _unpack_vector(*packed) for post_id, *packed in
+            PostVector.objects.filter(post_id__in=rescore).values_list('post_id', 'terms', 'weights', 'tags')
+        }
+        scores, _ = _score_against(rescored, corpus(), document_frequency, count)
+        rows.update((post_id, rank_top(row.items(), top_k)) for post_id, row in scores.items())
+    for post_id in changed - vectors.keys():
+        rows[post_id] = []
+    rows = {post_id: ranked for post_id, ranked in rows.items() if ranked != stored.get(post_id, [])}
+
+    with transaction.atomic():
+        PostVector.objects.filter(post_id__in=changed - vectors.keys()).delete()
+        PostVector.objects.bulk_create(
+            new_vectors, update_conflicts=True, unique_fields=['post'],
+            update_fields=['terms', 'weights', 'tags', 'updated_at'],
+        )
+        emptied = iter([post_id for post_id, ranked in rows.items() if not ranked])
+        while batch := list(islice(emptied, batch_size)):
+            RelatedPosts.objects.filter(kind='content', post_id__in=batch).delete()
+        _create_rows(rows, timezone.now(), batch_size)
+
+    invalidate_post_responses(*Post.objects.filter(pk__in=rows.keys()).values_list('slug', flat=True))
+    return set(rows)
+
+
+def compute_related_posts(top_k=None, chunk_size=500, batch_size=1000):
+    """Rebuild every post vector and the top K content neighbours of every post.
+
+    Posts are scored ``chunk_size`` rows of the similarity matrix at a time
+    to bound memory. Returns a dict of stats including the runtime and peak
+    memory.
+    """
+    if top_k is None:
+        top_k = related_top_k()
+    started_at = timezone.now()
+    started = time.monotonic()
+    vectors = {}
+    new_vectors = []
+    last_pk = 0
+    while True:
+        posts = list(
+            Post.objects.filter(status='published', pk__gt=last_pk).order_by('pk')
+            .only('pk', 'title', 'content')[:batch_size]
+        )
+        if not posts:
+            break
+        last_pk = posts[-1].pk
+        tag_ids = _load_tag_ids([post.pk for post in posts])
+        for post in posts:
+            vector = build_vector(post, tag_ids[post.pk])
+            vectors[post.pk] = _unpack_vector(vector.terms, vector.weights, vector.tags)
+            new_vectors.append(vector)
+
+    rows = dict(_neighbours(vectors, vectors.keys(), top_k, chunk_size))
+    with transaction.atomic():
+        PostVector.objects.all().delete()
+        PostVector.objects.bulk_create(new_vectors, batch_size=batch_size)
+        RelatedPosts.objects.filter(kind='content').delete()
+        _create_rows(rows, started_at, batch_size)
+
+    stored = [post_id for post_id, ranked in rows.items() if ranked]
+    invalidate_post_responses(*Post.objects.filter(pk__in=stored).values_list('slug', flat=True))
+    return {
+        'posts': len(vectors),
+        'stored': len(stored),
+        'vectorized': vectorized_available(),
+        'seconds': round(time.monotonic() - started, 2),
+        'peak_memory_mb': peak_memory_mb(),
+    }
@@ -0,0 +1,403 @@
+"""Image renditions, generated ahead of the requests that serve them.
+
+Renditions are served by the ``/media/r/<spec>/<path>`` endpoint in
+whichever format the client accepts. Saving a source image generates all
+of its renditions, in every format the endpoint can negotiate, in a thread
+pool, and the endpoint queues any it finds missing, so requests never run
+Pillow.
+Serializers link to that endpoint: one URL per rendition for every client,
+built without storage or cache lookups. ``backfill_renditions``
+regenerates them in bulk across a process pool, e.g. after a spec change
+or a media restore.
+
+Rendition files are addressed by the source's content hash and the spec's
+settings, so they never need invalidating.
+"""
+
+import hashlib
+import json
+import os
+import posixpath
+import threading
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.urls import reverse
+from PIL import Image
+from pilkit.processors import ProcessorPipeline
+from pilkit.utils import prepare_image, quiet, suggest_extension
+from .image_processors import (
+    DELIVERY_FORMATS, MIME_TYPES, RENDITION_SOURCES, RENDITIONS, StripMetadata,
+    rendition_encoding, rendition_fingerprint,
+)
+
+
+RENDITION_SPECS = [spec for _, specs in RENDITION_SOURCES.values() for spec in specs]
+
+_executor = None
+_executor_lock = threading.Lock()
+_futures = set()
+_pending = set()
+_pending_lock = threading.Lock()
+_quiet = None
+_quiet_depth = 0
+_quiet_lock = threading.Lock()
+
+
+def get_executor():
+    """Get the shared rendition worker pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'RENDITION_WORKERS', 2),
+                thread_name_prefix='rendition',
+            )
+        return _executor
+
+
+@contextmanager
+def quiet_stderr():
+    """Keep stderr on /dev/null while any thread is in a Pillow save.
+
+    Encoders can write warnings straight to file descriptor 2, so saves
+    point it at /dev/null, as pilkit's ``quiet`` does. The descriptor is
+    process-wide: overlapping saves in the worker pool, each swapping it
+    on its own, could restore the wrong one and leave stderr on /dev/null
+    for good. Here the first thread in redirects it and the last one out
+    restores it. Only the save itself runs inside, so decoding, resizing
+    and everything else other threads log keep their stderr.
+    """
+    global _quiet, _quiet_depth
+    with _quiet_lock:
+        if not _quiet_depth:
+            _quiet = quiet()
+            _quiet.__enter__()
+        _quiet_depth += 1
+    try:
+        yield
+    finally:
+        with _quiet_lock:
+            _quiet_depth -= 1
+            if not _quiet_depth:
+                _quiet.__exit__(None, None, None)
+                _quiet = None
+
+
+def schedule_rendition(name, source_name):
+    """Generate a rendition in every negotiable format in the worker pool, unless already queued."""
+    key = (name, source_name)
+    with _pending_lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+
+    def done(future):
+        _futures.discard(future)
+        with _pending_lock:
+            _pending.discard(key)
+
+    future = get_executor().submit(warm_rendition, name, source_name)
+    _futures.add(future)
+    future.add_done_callback(done)
+
+
+def schedule_renditions(source_field, source_name):
+    """Generate every rendition of a newly saved source image in the worker pool."""
+    _, specs = RENDITION_SOURCES[source_field]
+    for spec in specs:
+        schedule_rendition(spec, source_name)
+
+
+def rendition_url(request, source, spec):
+    """Get the absolute URL of a rendition on the format negotiating endpoint."""
+    return request.build_absolute_uri(reverse('rendition', args=[spec, source.name]))
+
+
+def wait_for_renditions(timeout=None):
+    """Block until every scheduled rendition has been generated."""
+    wait(_futures.copy(), timeout=timeout)
+
+
+def regenerate_rendition(spec, source_name, force=False):
+    """Write one rendition to storage in every format the endpoint can negotiate.
+
+    Returns True if it was (re)generated, False if it already existed and
+    None if the source image is missing from storage.
+    """
+    if not _find_source(spec).storage.exists(source_name):
+        return None
+    return warm_rendition(spec, source_name, force)
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_lines(path, lines):
+    with open(f'{path}.tmp', 'w') as handle:
+        handle.write(''.join(f'{line}\n' for line in lines))
+    os.replace(f'{path}.tmp', path)
+
+
+def _write_checkpoint(path, checkpoint):
+    _write_lines(path, [json.dumps(checkpoint)])
+
+
+def backfill_renditions(specs=None, workers=None, batch_size=100, checkpoint=None, force=False, progress=None):
+    """Regenerate renditions for every stored source image.
+
+    Sources are walked in primary key batches and each batch's renditions
+    are generated across ``workers`` processes (one per core by default,
+    in-process when ``workers`` is 1). After every batch the last primary
+    key done per source is written to the ``checkpoint`` file, so a rerun
+    resumes from there; the file is removed once the backfill completes.
+    ``progress`` is called with the running stats after each batch.
+
+    Returns a dict with the ``images`` and ``renditions`` processed, the
+    renditions ``generated``, those ``missing`` their source file and the
+    elapsed ``seconds``.
+    """
+    specs = set(specs or RENDITION_SPECS)
+    workers = workers or os.cpu_count() or 1
+    done = _read_checkpoint(checkpoint) if checkpoint else {}
+    stats = {'images': 0, 'renditions': 0, 'generated': 0, 'missing': 0, 'seconds': 0.0}
+    start = time.perf_counter()
+
+    pool = None
+    if workers > 1:
+        # Children must open their own database connections
+        connections.close_all()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+    try:
+        for source_field, (model_label, source_specs) in RENDITION_SOURCES.items():
+            chosen = [spec for spec in source_specs if spec in specs]
+            if not chosen:
+                continue
+            sources = apps.get_model(model_label).objects.exclude(
+                **{source_field: ''}
+            ).exclude(**{f'{source_field}__isnull': True}).order_by('pk')
+            last_pk = done.get(source_field, 0)
+            while True:
+                batch = list(sources.filter(pk__gt=last_pk).values_list('pk', source_field)[:batch_size])
+                if not batch:
+                    break
+                jobs = [(spec, name, force) for _, name in batch for spec in chosen]
+                if pool:
+                    results = list(pool.map(regenerate_rendition, *zip(*jobs)))
+                else:
+                    results = [regenerate_rendition(*job) for job in jobs]
+
+                last_pk = batch[-1][0]
+                done[source_field] = last_pk
+                if checkpoint:
+                    _write_checkpoint(checkpoint, done)
+                stats['images'] += len(batch)
+                stats['renditions'] += len(jobs)
+                stats['generated'] += results.count(True)
+                stats['missing'] += results.count(None)
+                stats['seconds'] = time.perf_counter() - start
+                if progress:
+                    progress(stats)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def _source_digest(source):
+    """Hash a source file's content, remembered by name since upload names are never reused."""
+    key = f'rendition-digest:{hashlib.md5(source.name.encode()).hexdigest()}'
+    digest = cache.get(key)
+    if digest is None:
+        hasher = hashlib.sha256()
+        source.open('rb')
+        try:
+            for chunk in source.chunks():
+                hasher.update(chunk)
+        finally:
+            source.close()
+        digest = hasher.hexdigest()
+        cache.set(key, digest, None)
+    return digest
+
+
+def negotiate_format(name, accept):
+    """Pick the format to deliver a rendition in from an ``Accept`` header.
+
+    AVIF is preferred over WebP, and either only when the client lists it
+    explicitly (a bare ``*/*`` gets the rendition's own format).
+    """
+    accepted = {}
+    for part in accept.split(','):
+        media_type, *params = [item.strip() for item in part.split(';')]
+        if media_type:
+            accepted[media_type.lower()] = _quality(params)
+    for image_format in DELIVERY_FORMATS:
+        if accepted.get(MIME_TYPES[image_format], 0) > 0:
+            return image_format
+    return RENDITIONS[name].format
+
+
+def _quality(params):
+    # A missing or malformed q-value counts as 1, as in RFC 9110
+    for param in params:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                return 1.0
+            return quality if 0 <= quality <= 1 else 1.0
+    return 1.0
+
+
+def delivery_formats(name):
+    """Get every format a named rendition can be negotiated into, its own first."""
+    return list(dict.fromkeys([RENDITIONS[name].format, *DELIVERY_FORMATS]))
+
+
+def warm_rendition(name, source_name, force=False):
+    """Generate a rendition in every format the endpoint can negotiate, ahead of requests.
+
+    Returns True if any format was encoded, False if all were stored already.
+    """
+    generated = False
+    for image_format in delivery_formats(name):
+        generated |= _store_rendition(name, source_name, image_format, force)[1]
+    return generated
+
+
+def _find_source(name):
+    for source_field, (model_label, specs) in RENDITION_SOURCES.items():
+        if name in specs:
+            return apps.get_model(model_label)._meta.get_field(source_field)
+    raise LookupError(f'Unknown rendition {name!r}')
+
+
+def _encode(name, source, image_format=None, baseline=False):
+    spec = RENDITIONS[name]
+    image_format, options = rendition_encoding(name, image_format)
+    processors = spec.processors
+    if baseline:
+        # How renditions were encoded before metadata stripping and encoder tuning
+        options = {'quality': options['quality']}
+        processors = [p for p in processors if not isinstance(p, StripMetadata)]
+    source.open('rb')
+    try:
+        with Image.open(source) as img:
+            img = ProcessorPipeline(processors).process(img)
+    finally:
+        source.close()
+    if spec.autoconvert:
+        img, save_kwargs = prepare_image(img, image_format)
+        options = {**save_kwargs, **options}
+    buffer = BytesIO()
+    with quiet_stderr():
+        img.save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def rendition_name(name, source_name, image_format=None):
+    """Get the storage name of a rendition of a source file, generated or not.
+
+    ``image_format`` delivers the rendition in another format (see
+    ``negotiate_format``). Raises ``LookupError`` for an unknown rendition
+    or a source it does not apply to, and ``FileNotFoundError`` if the
+    source is not in storage.
+    """
+    field = _find_source(name)
+    if posixpath.normpath(source_name) != source_name or not source_name.startswith(field.upload_to):
+        raise LookupError(f'{name!r} does not apply to {source_name!r}')
+    if not field.storage.exists(source_name):
+        raise FileNotFoundError(source_name)
+
+    digest = _source_digest(field.attr_class(None, field, source_name))
+    image_format, _ = rendition_encoding(name, image_format)
+    return (
+        f'CACHE/r/{name}/{rendition_fingerprint(name, image_format)}/{digest[:2]}/'
+        f'{digest}{suggest_extension(source_name, image_format)}'
+    )
+
+
+def _store_rendition(name, source_name, image_format=None, force=False):
+    # Returns the storage name and whether the rendition was encoded now
+    target = rendition_name(name, source_name, image_format)
+    if default_storage.exists(target):
+        if not force:
+            return target, False
+        # Saving over an existing name would store the file under a new one
+        default_storage.delete(target)
+    field = _find_source(name)
+    saved = default_storage.save(target, _encode(name, field.attr_class(None, field, source_name), image_format))
+    if saved != target:
+        # A concurrent request wrote it first
+        default_storage.delete(saved)
+    return target, True
+
+
+def measure_rendition_savings(specs=None, limit=20):
+    """Compare encoded sizes of renditions against the untuned encoding.
+
+    Encodes each chosen rendition of the ``limit`` most recent source
+    images of its field, in memory. Returns a dict keyed by rendition name
+    with the number of ``images``, the ``baseline`` bytes (the spec's format
+    and quality only, metadata kept) and the bytes per delivery format.
+    """
+    specs = set(specs or RENDITION_SPECS)
+    report = {}
+    for source_field, (model_label, source_specs) in RENDITION_SOURCES.items():
+        chosen = [spec for spec in source_specs if spec in specs]
+        if not chosen:
+            continue
+        field = apps.get_model(model_label)._meta.get_field(source_field)
+        names = apps.get_model(model_label).objects.exclude(
+            **{source_field: ''}
+        ).exclude(**{f'{source_field}__isnull': True}).order_by('-pk').values_list(source_field, flat=True)[:limit]
+        sources = [
+            field.attr_class(None, field, name) for name in names if field.storage.exists(name)
+        ]
+        for spec in chosen:
+            formats = delivery_formats(spec)
+            sizes = {'images': len(sources), 'baseline': 0, **{fmt: 0 for fmt in formats}}
+            for source in sources:
+                sizes['baseline'] += _encode(spec, source, baseline=True).size
+                for image_format in formats:
+                    sizes[image_format] += _encode(spec, source, image_format).size
+            report[spec] = sizes
+    return report
+
+
+def discard_renditions(source_name, digest=''):
+    """Delete every rendition of a source file, addressed by the source's ``digest``."""
+    if not digest:
+        return
+    for source_field, (model_label, specs) in RENDITION_SOURCES.items():
+        if not source_name.startswith(apps.get_model(model_label)._meta.get_field(source_field).upload_to):
+            continue
+        for spec in specs:
+            base = f'CACHE/r/{spec}'
+            if not default_storage.exists(base):
+                continue
+            for fingerprint in default_storage.listdir(base)[0]:
+                directory = f'{base}/{fingerprint}/{digest[:2]}'
+                if default_storage.exists(directory):
+                    for filename in default_storage.listdir(directory)[1]:
+                        if filename.startswith(digest):
+                            default_storage.delete(f'{directory}/{filename}')
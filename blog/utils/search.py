@@ -0,0 +1,128 @@
+"""Full-text search for posts backed by an SQLite FTS5 index."""
+
+import re
+from django.db import connection
+from django.db.models import FloatField, TextField
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from blog.models import Post
+
+
+SEARCH_TABLE = 'blog_post_fts'
+SNIPPET_TOKENS = 24
+# Control characters marking matches in raw snippets; they cannot occur in escaped text
+MATCH_START, MATCH_END = '\x02', '\x03'
+
+_index_available = None
+
+
+def search_index_available():
+    """Check whether the FTS5 index exists on the current database."""
+    global _index_available
+    if _index_available is None:
+        _index_available = (
+            connection.vendor == 'sqlite'
+            and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _index_available
+
+
+def build_match_query(terms):
+    """Turn user search terms into a safe FTS5 query with prefix matching."""
+    words = re.findall(r'\w+', ' '.join(terms))
+    return ' '.join('"{}"*'.format(word) for word in words)
+
+
+def _index_rows(posts):
+    rows = []
+    for post in posts:
+        tags = ' '.join(tag.name for tag in post.tags.all())
+        rows.append((post.pk, post.title, post.content, tags))
+    return rows
+
+
+def index_posts(posts):
+    """Add or refresh the index entries of the given posts."""
+    if not search_index_available():
+        return
+    rows = _index_rows(posts)
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)',
+            rows
+        )
+
+
+def remove_post(post_id):
+    """Remove a post from the index."""
+    if not search_index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild_search_index(batch_size=500):
+    """Rebuild the whole index from the Post table. Returns posts indexed."""
+    if not search_index_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    indexed = 0
+    last_pk = 0
+    while True:
+        posts = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'title', 'content').prefetch_related('tags')[:batch_size]
+        )
+        if not posts:
+            break
+        last_pk = posts[-1].pk
+        index_posts(posts)
+        indexed += len(posts)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return indexed
+
+
+class SnippetField(TextField):
+    """Snippet of indexed text: escaped as HTML, with only the matches wrapped in ``<mark>``."""
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        value = escape(value)
+        return value.replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+
+def search_posts(queryset, terms):
+    """Filter a post queryset to index matches, annotated with rank and snippet.
+
+    ``search_rank`` is the bm25 score (lower is more relevant) and
+    ``search_snippet`` is HTML-escaped text with matches in ``<mark>`` tags.
+    """
+    match = build_match_query(terms)
+    if not match:
+        return queryset
+    table = connection.ops.quote_name(Post._meta.db_table)
+    return queryset.filter(
+        pk__in=RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [match])
+    ).annotate(
+        search_rank=RawSQL(
+            f'SELECT bm25({SEARCH_TABLE}, 10.0, 1.0, 5.0) FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s AND rowid = {table}.id',
+            [match],
+            output_field=FloatField(),
+        ),
+        search_snippet=RawSQL(
+            f"SELECT snippet({SEARCH_TABLE}, -1, %s, %s, '...', {SNIPPET_TOKENS}) "
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND rowid = {table}.id',
+            [MATCH_START, MATCH_END, match],
+            output_field=SnippetField(),
+        ),
+    )
+
@@ -0,0 +1,66 @@
+"""Background work run after the current transaction commits.
+
+Feed fan-out and related post refreshes are scheduled here so requests
+only pay for the write that triggered them. Tasks run in a small thread
+pool; with ``BACKGROUND_WORKERS = 0`` they run inline on commit instead.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, transaction
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_batches = threading.local()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BACKGROUND_WORKERS', 2),
+                thread_name_prefix='background',
+            )
+        return _executor
+
+
+def _run(func, *args):
+    try:
+        func(*args)
+    finally:
+        # Worker threads open their own connection
+        connection.close()
+
+
+def schedule(func, *args):
+    """Run ``func(*args)`` in the background once the current transaction commits."""
+    def submit():
+        if not getattr(settings, 'BACKGROUND_WORKERS', 2):
+            func(*args)
+            return
+        get_executor().submit(_run, func, *args)
+
+    transaction.on_commit(submit)
+
+
+def schedule_batch(func, items):
+    """Run ``func(items)`` in the background once the current transaction commits.
+
+    Items scheduled for the same ``func`` during one transaction are merged
+    into a single call with their sorted union, so a post saved and then
+    retagged is handled once. Batches are kept per thread, like transactions.
+    """
+    pending = _batches.__dict__.setdefault('pending', {})
+    pending.setdefault(func, set()).update(items)
+    # Each call registers its own flush, so items left by a rolled back
+    # transaction go out with the next one; the first flush takes them all
+    transaction.on_commit(lambda: _flush_batch(func))
+
+
+def _flush_batch(func):
+    items = _batches.__dict__.get('pending', {}).pop(func, None)
+    if items:
+        schedule(func, sorted(items))
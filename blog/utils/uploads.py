@@ -0,0 +1,181 @@
+"""Resumable chunked image uploads.
+
+A client creates an ``ImageUpload`` with the file's name and size, sends
+the bytes in chunks at the current offset and then completes it. Chunks
+are streamed to a partial file outside the media root while a SHA-256 is
+updated incrementally; completing validates the image and stores it
+through the deduplicating image storage, ready to attach to a post.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from blog.models import ImageUpload, Post
+from blog.storage import image_storage
+from .validators import validate_featured_image
+
+
+CHUNK_READ_SIZE = 64 * 1024
+
+# Running hashes of in-progress uploads: upload id -> (offset hashed up to, hasher)
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+class UploadOffsetError(Exception):
+    """Raised when a chunk does not start at the upload's current offset."""
+
+
+def partial_path(upload):
+    """Get the path of the file an upload's chunks are written to."""
+    directory = getattr(settings, 'CHUNKED_UPLOAD_DIR', None) or os.path.join(
+        tempfile.gettempdir(), 'blog-uploads'
+    )
+    return os.path.join(directory, f'{upload.pk}.part')
+
+
+def _hasher_at(upload, path):
+    """Get the running hash of an upload's first ``upload.offset`` bytes.
+
+    The hash normally lives in this process; after a restart, or when the
+    previous chunk went to another process, it is rebuilt from the file.
+    """
+    with _hashers_lock:
+        offset, hasher = _hashers.get(upload.pk, (None, None))
+    if offset == upload.offset:
+        return hasher
+    hasher = hashlib.sha256()
+    if upload.offset:
+        with open(path, 'rb') as handle:
+            remaining = upload.offset
+            while remaining:
+                chunk = handle.read(min(CHUNK_READ_SIZE, remaining))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                remaining -= len(chunk)
+    return hasher
+
+
+def append_chunk(upload_id, stream, start, length):
+    """Stream ``length`` bytes from ``stream`` into an upload at offset ``start``.
+
+    Raises ``UploadOffsetError`` unless ``start`` is the upload's current
+    offset and the chunk fits in the declared size. Bytes received before
+    the stream ends are kept, so a client whose connection dropped resumes
+    from the returned upload's ``offset``.
+
+    The chunk is read from the client into its own file first; the upload
+    row is only locked to check the offset again and append that local
+    file, so a slow client never holds the lock.
+    """
+    upload = ImageUpload.objects.get(pk=upload_id)
+    _check_offset(upload, start, length)
+
+    path = partial_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor, chunk_path = tempfile.mkstemp(prefix=f'{upload.pk}.', suffix='.chunk', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(descriptor, 'w+b') as chunk_file:
+            remaining = length
+            while remaining:
+                chunk = stream.read(min(CHUNK_READ_SIZE, remaining))
+                if not chunk:
+                    break
+                chunk_file.write(chunk)
+                remaining -= len(chunk)
+            chunk_file.seek(0)
+
+            with transaction.atomic():
+                upload = ImageUpload.objects.select_for_update().get(pk=upload_id)
+                _check_offset(upload, start, length)
+                hasher = _hasher_at(upload, path)
+                with open(path, 'ab') as handle:
+                    # Drop bytes a crashed request wrote past the recorded offset
+                    handle.truncate(upload.offset)
+                    while chunk := chunk_file.read(CHUNK_READ_SIZE):
+                        handle.write(chunk)
+                        hasher.update(chunk)
+
+                upload.offset += length - remaining
+                upload.save(update_fields=['offset', 'updated_at'])
+                with _hashers_lock:
+                    _hashers[upload.pk] = (upload.offset, hasher)
+    finally:
+        os.remove(chunk_path)
+    return upload
+
+
+def _check_offset(upload, start, length):
+    if upload.status != 'pending' or start != upload.offset or start + length > upload.size:
+        raise UploadOffsetError(upload.offset)
+
+
+def complete_upload(upload_id):
+    """Validate a fully received upload and store it as a featured image.
+
+    Raises ``ValidationError`` if bytes are missing or the file is not an
+    acceptable image; a file that fails validation is discarded with its
+    upload. Returns the completed upload.
+    """
+    with transaction.atomic():
+        upload = ImageUpload.objects.select_for_update().get(pk=upload_id)
+        if upload.status == 'complete':
+            return upload
+        if upload.offset != upload.size:
+            raise ValidationError(
+                'Upload is incomplete: %(offset)s of %(size)s bytes received.',
+                code='incomplete', params={'offset': upload.offset, 'size': upload.size},
+            )
+
+        path = partial_path(upload)
+        digest = _hasher_at(upload, path).hexdigest()
+        field = Post._meta.get_field('featured_image')
+        with open(path, 'rb') as handle:
+            content = File(handle, name=upload.filename)
+            content.sha256 = digest
+            try:
+                validate_featured_image(content)
+            except ValidationError as exc:
+                error = exc
+            else:
+                error = None
+                upload.stored_name = image_storage.save(field.generate_filename(None, upload.filename), content)
+        _discard_partial(upload)
+        if error is not None:
+            upload.delete()
+        else:
+            upload.status = 'complete'
+            upload.save(update_fields=['status', 'stored_name', 'updated_at'])
+    if error is not None:
+        raise error
+    return upload
+
+
+def _discard_partial(upload):
+    with _hashers_lock:
+        _hashers.pop(upload.pk, None)
+    try:
+        os.remove(partial_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def expire_uploads(max_age=86400):
+    """Delete uploads not touched for ``max_age`` seconds with their partial files.
+
+    Completed uploads only lose their session; the stored file is
+    reference counted like any other. Returns the number deleted.
+    """
+    expired = list(ImageUpload.objects.filter(updated_at__lt=timezone.now() - timedelta(seconds=max_age)))
+    for upload in expired:
+        _discard_partial(upload)
+    ImageUpload.objects.filter(pk__in=[upload.pk for upload in expired]).delete()
+    return len(expired)
@@ -1,48 +1,98 @@
 """Image validation utilities."""
 
+import posixpath
 from django.core.exceptions import ValidationError
-from django.core.files.images import get_image_dimensions
+from django.utils.deconstruct import deconstructible
 from PIL import Image
-import os
 
 
-def validate_image_size(image):
-    """Validate image file size (max 5MB)."""
-    max_size = 5 * 1024 * 1024  # 5MB
-    if image.size > max_size:
-        raise ValidationError('Image file too large. Maximum size is 5MB.')
+# File extensions accepted for each image format
+FORMAT_EXTENSIONS = {
+    'JPEG': ('jpg', 'jpeg'),
+    'PNG': ('png',),
+    'WEBP': ('webp',),
+    'GIF': ('gif',),
+}
 
 
-def validate_image_dimensions(image):
-    """Validate image dimensions (max 4000x4000)."""
-    width, height = get_image_dimensions(image)
-    max_dimension = 4000
-    
-    if width > max_dimension or height > max_dimension:
-        raise ValidationError(f'Image dimensions too large. Maximum is {max_dimension}x{max_dimension}.')
+@deconstructible
+class ImageUploadValidator:
+    """Validate an uploaded image's size, format and dimensions in one pass.
 
+    The file size and name extension are checked first, without reading the
+    file; the extension must belong to an allowed format, so a file with an
+    image header cannot be stored as ``.html`` or ``.svg``. Format and
+    dimensions then come from a single header read (``Image.open`` does not
+    decode pixel data); the format is kept on the file as ``image_format``.
+    Each failure is raised as a ``ValidationError`` with its own ``code``
+    and ``params``.
+    """
 
-def validate_image_format(image):
-    """Validate image format (JPEG, PNG, WebP only)."""
-    allowed_formats = ['JPEG', 'PNG', 'WEBP']
-    
-    try:
-        with Image.open(image) as img:
-            if img.format not in allowed_formats:
-                raise ValidationError(f'Invalid image format. Allowed formats: {", ".join(allowed_formats)}')
-    except Exception:
-        raise ValidationError('Invalid image file.')
+    messages = {
+        'file_too_large': 'Image file too large. Maximum size is %(max_size_mb)sMB.',
+        'invalid_extension': 'File extension "%(extension)s" is not allowed. Allowed extensions: %(allowed_extensions)s.',
+        'invalid_image': 'Invalid image file.',
+        'invalid_format': 'Invalid image format. Allowed formats: %(allowed_formats)s',
+        'dimensions_too_large': 'Image dimensions too large. Maximum is %(max_dimension)sx%(max_dimension)s.',
+    }
 
+    def __init__(self, max_size=5 * 1024 * 1024, max_dimension=4000, allowed_formats=('JPEG', 'PNG', 'WEBP')):
+        self.max_size = max_size
+        self.max_dimension = max_dimension
+        self.allowed_formats = tuple(allowed_formats)
 
-def validate_avatar_image(image):
-    """Validate avatar image."""
-    validate_image_size(image)
-    validate_image_dimensions(image)
-    validate_image_format(image)
+    @property
+    def allowed_extensions(self):
+        return [extension for image_format in self.allowed_formats for extension in FORMAT_EXTENSIONS[image_format]]
 
+    def validate_name(self, name):
+        """Check a file name's extension belongs to an allowed format."""
+        extension = posixpath.splitext(name or '')[1][1:].lower()
+        if extension not in self.allowed_extensions:
+            raise self.error(
+                'invalid_extension', extension=extension, allowed_extensions=', '.join(self.allowed_extensions)
+            )
 
-def validate_featured_image(image):
-    """Validate featured image."""
-    validate_image_size(image)
-    validate_image_dimensions(image)
-    validate_image_format(image)
\ No newline at end of file
+    def __call__(self, image):
+        if image.size > self.max_size:
+            raise self.error('file_too_large', max_size_mb=self.max_size // (1024 * 1024), size=image.size)
+        self.validate_name(image.name)
+
+        try:
+            image.seek(0)
+            with Image.open(image) as img:
+                image_format, (width, height) = img.format, img.size
+        except Image.DecompressionBombError:
+            raise self.error('dimensions_too_large', max_dimension=self.max_dimension)
+        except (OSError, SyntaxError, ValueError):
+            raise self.error('invalid_image')
+        finally:
+            image.seek(0)
+        # Lets the storage name the file after its real format
+        image.image_format = image_format
+
+        errors = []
+        if image_format not in self.allowed_formats:
+            errors.append(self.error(
+                'invalid_format', allowed_formats=', '.join(self.allowed_formats), format=image_format
+            ))
+        if width > self.max_dimension or height > self.max_dimension:
+            errors.append(self.error(
+                'dimensions_too_large', max_dimension=self.max_dimension, width=width, height=height
+            ))
+        if errors:
+            raise ValidationError(errors)
+
+    def error(self, code, **params):
+        return ValidationError(self.messages[code], code=code, params=params)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ImageUploadValidator)
+            and (self.max_size, self.max_dimension, self.allowed_formats)
+            == (other.max_size, other.max_dimension, other.allowed_formats)
+        )
+
+
+validate_avatar_image = ImageUploadValidator()
+validate_featured_image = ImageUploadValidator()
@@ -0,0 +1,44 @@
+"""Optional NumPy and SciPy support for the precomputed neighbour lists.
+
+Follow suggestions, "readers also liked" and related content score
+candidates with sparse matrix products when NumPy and SciPy are installed
+(``pip install blog-api[vectorized]``) and from in-memory sets otherwise.
+Both paths rank their scores with ``rank_top``, so they store the same
+rows.
+"""
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+
+def vectorized_available():
+    """Check whether NumPy and SciPy are installed for the vectorized pass."""
+    return sparse is not None
+
+
+def rank_top(scores, top_k):
+    """Rank ``(id, score)`` pairs into the top ``top_k`` ``[id, score]`` lists, best first.
+
+    Scores are rounded to four places before ranking, so summation order
+    cannot reorder equal scores, and ties break by id. Scores that round
+    to zero or less are dropped.
+    """
+    rounded = [(item_id, round(float(score), 4)) for item_id, score in scores]
+    ranked = sorted((item for item in rounded if item[1] > 0), key=lambda item: (-item[1], item[0]))
+    return [[item_id, score] for item_id, score in ranked[:top_k]]
+
+
+def top_candidates(data, columns, top_k):
+    """Drop the entries of a sparse row that cannot make its top ``top_k``.
+
+    Everything that may round to the k-th score is kept, so ``rank_top``
+    still breaks ties by id.
+    """
+    if len(data) > top_k:
+        threshold = np.partition(data, len(data) - top_k)[len(data) - top_k]
+        keep = data >= threshold - 1e-4
+        data, columns = data[keep], columns[keep]
+    return data, columns
@@ -0,0 +1,123 @@
+"""Write-behind buffer for post view counts."""
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.dispatch import Signal
+from blog.models import Post
+
+
+logger = logging.getLogger(__name__)
+
+# Sent after a flush with ``deltas``, a dict of post id to flushed views
+views_flushed = Signal()
+
+
+class ViewCountBuffer:
+    """Collect view increments in memory and write them to the database in batches.
+
+    Pending increments are flushed with a single UPDATE once the total
+    number of buffered views reaches ``flush_threshold`` or ``flush_interval``
+    seconds have passed since the last flush. A timer flushes views left
+    behind by a burst, so they do not wait for the next view to arrive.
+    """
+
+    def __init__(self, flush_interval=10, flush_threshold=100):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def _start_timer(self):
+        # Called with the lock held
+        if self._timer is None and self.flush_interval:
+            self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_on_timer(self):
+        try:
+            self.try_flush()
+        finally:
+            # The timer thread opened its own connection
+            connection.close()
+
+    def increment(self, post_id, amount=1):
+        """Record views for a post and return its pending (unflushed) delta."""
+        with self._lock:
+            self._pending[post_id] += amount
+            pending = self._pending[post_id]
+            due = (
+                sum(self._pending.values()) >= self.flush_threshold
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+            if not due:
+                self._start_timer()
+        if due:
+            self.try_flush()
+        return pending
+
+    def pending(self, post_id):
+        """Get the number of views recorded for a post but not yet flushed."""
+        with self._lock:
+            return self._pending.get(post_id, 0)
+
+    def flush(self):
+        """Write all pending increments to the database.
+
+        Returns a dict of the flushed deltas keyed by post id. If the update
+        fails the increments are put back so they are not lost.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return {}
+
+        try:
+            with transaction.atomic():
+                Post.objects.filter(pk__in=list(pending)).update(
+                    views_count=F('views_count') + Case(
+                        *[When(pk=post_id, then=Value(delta)) for post_id, delta in pending.items()],
+                        default=Value(0),
+                        output_field=IntegerField(),
+                    )
+                )
+                views_flushed.send(sender=self.__class__, deltas=dict(pending))
+        except Exception:
+            with self._lock:
+                self._pending.update(pending)
+                self._start_timer()
+            raise
+        return dict(pending)
+
+    def try_flush(self):
+        """Flush like ``flush`` but log a failure instead of raising it.
+
+        Used for flushes triggered by unrelated requests and by the timer;
+        the increments stay buffered for the next attempt.
+        """
+        try:
+            return self.flush()
+        except Exception:
+            logger.exception('Could not flush buffered post views; will retry')
+            return {}
+
+
+view_counter = ViewCountBuffer(
+    flush_interval=getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 10),
+    flush_threshold=getattr(settings, 'VIEW_COUNT_FLUSH_THRESHOLD', 100),
+)
+
+# Write out pending views when the process shuts down cleanly.
+atexit.register(view_counter.flush)
@@ -6,6 +6,8 @@ from .post import PostViewSet
 from .comment import CommentViewSet
 from .user import UserViewSet
 from .reaction import ReactionViewSet, ReadingListViewSet
+from .upload import ImageUploadViewSet
+from .feed import FeedViewSet
 
 __all__ = [
     'CategoryViewSet',
@@ -15,4 +17,6 @@ __all__ = [
     'UserViewSet',
     'ReactionViewSet',
     'ReadingListViewSet',
+    'ImageUploadViewSet',
+    'FeedViewSet',
 ]
\ No newline at end of file
@@ -0,0 +1,18 @@
+"""Home feed viewset."""
+
+from rest_framework import viewsets, permissions
+from blog.serializers import PostListSerializer
+from blog.utils.pagination import FeedPagination
+
+
+class FeedViewSet(viewsets.ViewSet):
+    """Recent published posts from the users the current user follows."""
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def list(self, request):
+        """Get a page of the user's feed; follow ``next`` for older posts."""
+        paginator = FeedPagination()
+        posts = paginator.paginate_feed(request.user, request)
+        serializer = PostListSerializer(posts, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
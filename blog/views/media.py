@@ -0,0 +1,45 @@
+"""Media views."""
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from django.views.decorators.http import require_safe
+from blog.storage import image_storage
+from blog.utils.image_processors import MIME_TYPES
+from blog.utils.renditions import negotiate_format, rendition_name, schedule_rendition
+
+
+@require_safe
+def rendition(request, spec, path):
+    """Serve a rendition of a media file.
+
+    The format (AVIF, WebP or the rendition's own) is negotiated from the
+    ``Accept`` header, so one URL serves every client. A rendition not
+    generated yet is queued for the worker pool and the original image is
+    served meanwhile, uncached, so no request waits on Pillow.
+    """
+    try:
+        image_format = negotiate_format(spec, request.headers.get('Accept', ''))
+        name = rendition_name(spec, path, image_format)
+    except (LookupError, FileNotFoundError):
+        raise Http404('No such rendition.')
+
+    if not default_storage.exists(name):
+        schedule_rendition(spec, path)
+        response = FileResponse(image_storage.open(path))
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    # The stored name is derived from the source content and spec settings
+    etag = quote_etag(name)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(default_storage.open(name), content_type=MIME_TYPES[image_format])
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'RENDITION_CACHE_MAX_AGE', 31536000))
+    patch_vary_headers(response, ['Accept'])
+    return response
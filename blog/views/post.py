@@ -4,10 +4,12 @@ from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import F, Q
+from django.db.models import Q
+from django.http import HttpResponse
 from blog.models import Post
 from blog.serializers import PostListSerializer, PostDetailSerializer, PostCreateUpdateSerializer
-from blog.utils import PostFilter, get_blog_statistics, get_blog_statistics
+from blog.utils import PostFilter, PostSearchFilter, get_blog_statistics, view_counter
+from blog.utils.cache import get_response_cache, is_cacheable
 
 
 class IsAuthorOrAdminOrReadOnly(permissions.BasePermission):
@@ -24,15 +26,20 @@ class PostViewSet(viewsets.ModelViewSet):
     
     queryset = Post.objects.all()
     lookup_field = 'slug'
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, PostSearchFilter]
     filterset_class = PostFilter
     search_fields = ['title', 'content']
     ordering_fields = ['created_at', 'views_count', 'title']
     ordering = ['-created_at']
+    list_actions = ['list', 'my_posts', 'drafts', 'featured']
     
     def get_queryset(self):
         """Filter posts based on user permissions."""
-        queryset = Post.objects.select_related('author', 'category').prefetch_related('tags', 'comments')
+        if self.action in self.list_actions:
+            # List responses use the stored excerpt, never the full content or comments
+            queryset = Post.objects.for_list()
+        else:
+            queryset = Post.objects.select_related('author', 'category').prefetch_related('tags')
         
         # Show only published posts to non-authenticated users
         if not self.request.user.is_authenticated:
@@ -63,16 +70,59 @@ class PostViewSet(viewsets.ModelViewSet):
             permission_classes = [permissions.AllowAny]
         return [permission() for permission in permission_classes]
     
+    def get_cached_response(self, request, scope):
+        """Look up a cached response; returns (key, entry), key is None if uncacheable."""
+        if not is_cacheable(request):
+            return None, None
+        cache = get_response_cache()
+        key = cache.build_key(request, scope)
+        return key, cache.get(key)
+    
+    def cache_response(self, response, key, post_id=None):
+        """Store the rendered response under key once it has been rendered."""
+        if key is None or response.status_code != status.HTTP_200_OK:
+            return response
+        
+        def store(rendered):
+            get_response_cache().set(key, {
+                'content': rendered.content,
+                'content_type': rendered['Content-Type'],
+                'post_id': post_id,
+            })
+        
+        response.add_post_render_callback(store)
+        response['X-Cache'] = 'MISS'
+        return response
+    
+    def cached_hit(self, entry):
+        """Build a response from a cache entry."""
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        response['X-Cache'] = 'HIT'
+        return response
+    
+    def list(self, request, *args, **kwargs):
+        """List posts, serving anonymous requests from the response cache."""
+        key, entry = self.get_cached_response(request, 'posts:list')
+        if entry is not None:
+            return self.cached_hit(entry)
+        response = super().list(request, *args, **kwargs)
+        return self.cache_response(response, key)
+    
     def retrieve(self, request, *args, **kwargs):
         """Get single post by slug and increment view count."""
+        key, entry = self.get_cached_response(request, f'post:{kwargs[self.lookup_field]}')
+        if entry is not None:
+            # Cached bodies keep their views_count until invalidated, but still count the view
+            view_counter.increment(entry['post_id'])
+            return self.cached_hit(entry)
+        
         instance = self.get_object()
         
-        # Increment view count
-        Post.objects.filter(slug=instance.slug).update(views_count=F('views_count') + 1)
-        instance.refresh_from_db()
+        # Buffer the view; show the last flushed count plus pending views
+        instance.views_count += view_counter.increment(instance.pk)
         
         serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        return self.cache_response(Response(serializer.data), key, post_id=instance.pk)
     
     def perform_create(self, serializer):
         """Set author when creating post."""
@@ -81,23 +131,33 @@ class PostViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def my_posts(self, request):
         """Get current user's posts (including drafts)."""
-        posts = Post.objects.filter(author=request.user).select_related('category').prefetch_related('tags')
-        serializer = PostListSerializer(posts, many=True, context={'request': request})
-        return Response(serializer.data)
+        posts = Post.objects.filter(author=request.user).for_list()
+        return self.paginated_list(posts)
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
     def statistics(self, request):
-        """Get blog statistics - total posts, views, most viewed post."""
-        stats = get_blog_statistics()
+        """Get blog statistics - total posts, views, most viewed post.
+        
+        Pass ?by=category or ?by=author for a breakdown.
+        """
+        stats = get_blog_statistics(breakdown=request.query_params.get('by'))
         return Response(stats)
     
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def cache_stats(self, request):
+        """Get response cache hit-rate counters for this process (admin only)."""
+        return Response(get_response_cache().stats())
+    
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def drafts(self, request):
         """Get current user's draft posts."""
-        drafts = Post.objects.filter(author=request.user, status='draft')
-        drafts = drafts.select_related('category').prefetch_related('tags')
-        serializer = PostListSerializer(drafts, many=True, context={'request': request})
-        return Response(serializer.data)
+        if not request.user.is_staff:
+            # Only show own drafts unless admin
+            drafts = Post.objects.filter(author=request.user, status='draft')
+        else:
+            drafts = Post.objects.filter(status='draft')
+        
+        return self.paginated_list(drafts.for_list())
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
     def featured(self, request):
@@ -105,26 +165,11 @@ class PostViewSet(viewsets.ModelViewSet):
         featured_posts = Post.objects.filter(
             status='published', 
             is_featured=True
-        ).select_related('author', 'category').prefetch_related('tags')[:10]
-        
-        serializer = PostListSerializer(featured_posts, many=True, context={'request': request})
-        return Response(serializer.data)
+        ).for_list()
+        return self.paginated_list(featured_posts)
     
-    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
-    def statistics(self, request):
-        """Get blog statistics - total posts, views, most viewed post."""
-        stats = get_blog_statistics()
-        return Response(stats)
-    
-    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
-    def drafts(self, request):
-        """Get current user's draft posts."""
-        if not request.user.is_staff and request.user != request.user:
-            # Only show own drafts unless admin
-            drafts = Post.objects.filter(author=request.user, status='draft')
-        else:
-            drafts = Post.objects.filter(status='draft')
-        
-        drafts = drafts.select_related('category').prefetch_related('tags')
-        serializer = PostListSerializer(drafts, many=True, context={'request': request})
-        return Response(serializer.data)
\ No newline at end of file
+    def paginated_list(self, queryset):
+        """Serialize one page of ``queryset`` with the list serializer."""
+        page = self.paginate_queryset(queryset)
+        serializer = PostListSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
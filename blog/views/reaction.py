@@ -4,8 +4,9 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from blog.models import Post, Reaction, ReadingList
+from blog.models import Post, ReadingList
 from blog.serializers import ReactionSerializer, ReadingListSerializer
+from blog.utils import toggle_reaction
 
 
 class ReactionViewSet(viewsets.ViewSet):
@@ -33,32 +34,29 @@ class ReactionViewSet(viewsets.ViewSet):
         
         post = get_object_or_404(Post, slug=post_slug, status='published')
         
-        # Check if reaction already exists
-        reaction, created = Reaction.objects.get_or_create(
-            user=request.user,
-            post=post,
-            reaction_type=reaction_type
-        )
+        # Remove the reaction if it exists, otherwise add it
+        reaction, added = toggle_reaction(request.user, post, reaction_type)
         
-        if not created:
-            # Remove existing reaction
-            reaction.delete()
+        if not added:
             return Response({'status': 'removed'}, status=status.HTTP_200_OK)
         
         serializer = ReactionSerializer(reaction)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class ReadingListViewSet(viewsets.ViewSet):
+class ReadingListViewSet(viewsets.GenericViewSet):
     """ViewSet for user's reading list."""
     
     permission_classes = [permissions.IsAuthenticated]
     
     def list(self, request):
         """Get user's reading list."""
-        reading_list = ReadingList.objects.filter(user=request.user).select_related('post')
-        serializer = ReadingListSerializer(reading_list, many=True, context={'request': request})
-        return Response(serializer.data)
+        reading_list = ReadingList.objects.filter(user=request.user).select_related(
+            'post__author', 'post__category'
+        ).prefetch_related('post__tags')
+        page = self.paginate_queryset(reading_list)
+        serializer = ReadingListSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
     
     def create(self, request):
         """Add post to reading list."""
@@ -0,0 +1,70 @@
+"""Chunked image upload viewsets."""
+
+import re
+from django.core.exceptions import ValidationError
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from blog.models import ImageUpload
+from blog.serializers import ImageUploadSerializer
+from blog.utils.uploads import UploadOffsetError, append_chunk, complete_upload
+
+
+class ImageUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Resumable featured image uploads.
+
+    Create a session with ``filename`` and ``size``, PUT the bytes in chunks
+    with a ``Content-Range: bytes start-end/size`` header, then POST to
+    ``complete``. After an interruption, GET the session and continue from
+    its ``offset``. The completed upload's id is accepted as
+    ``featured_image_upload`` when creating or editing a post.
+    """
+    
+    serializer_class = ImageUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    content_range_pattern = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+    # Each chunk is one short request, so slow clients never hold a worker for a whole file
+    max_chunk_size = 1024 * 1024
+    
+    def get_queryset(self):
+        return ImageUpload.objects.filter(user=self.request.user)
+    
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+    
+    def update(self, request, pk=None):
+        """Append a chunk of raw bytes at the upload's current offset."""
+        upload = self.get_object()
+        match = self.content_range_pattern.match(request.headers.get('Content-Range', ''))
+        if not match:
+            return Response(
+                {'error': 'Content-Range: bytes start-end/size header is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        start, end, total = map(int, match.groups())
+        if end < start or total != upload.size:
+            return Response({'error': 'Invalid Content-Range'}, status=status.HTTP_400_BAD_REQUEST)
+        if end - start + 1 > self.max_chunk_size:
+            return Response(
+                {'error': f'Chunks are limited to {self.max_chunk_size} bytes'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        
+        try:
+            upload = append_chunk(upload.pk, request.stream, start, end - start + 1)
+        except UploadOffsetError as exc:
+            return Response(
+                {'error': 'Chunk does not start at the upload offset', 'offset': exc.args[0]},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(self.get_serializer(upload).data)
+    
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Validate the received image and store it."""
+        upload = self.get_object()
+        try:
+            upload = complete_upload(upload.pk)
+        except ValidationError as exc:
+            return Response({'error': ' '.join(exc.messages)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(upload).data)
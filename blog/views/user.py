@@ -4,9 +4,11 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth.models import User
-from django.db.models import F
-from blog.models import UserProfile, Follow
+from blog.models import Follow
 from blog.serializers import UserSerializer, UserProfileSerializer, FollowSerializer
+from blog.utils import follow_user, unfollow_user
+from blog.utils.follows import prime_following_cache
+from blog.utils.suggestions import get_follow_suggestions
 
 
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
@@ -27,64 +29,58 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        follow_obj, created = Follow.objects.get_or_create(
-            follower=request.user,
-            following=user_to_follow
-        )
-        
         if request.method == 'POST':
+            _, created = follow_user(request.user, user_to_follow)
             if not created:
                 return Response(
                     {'error': 'Already following this user'}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
-            # Update follower counts
-            user_to_follow.profile.follower_count = F('follower_count') + 1
-            user_to_follow.profile.save()
-            request.user.profile.following_count = F('following_count') + 1
-            request.user.profile.save()
-            
             return Response({'status': 'following'}, status=status.HTTP_201_CREATED)
         
-        elif request.method == 'DELETE':
-            if created:
-                follow_obj.delete()
-            
-            deleted_count, _ = Follow.objects.filter(
-                follower=request.user,
-                following=user_to_follow
-            ).delete()
-            
-            if deleted_count:
-                # Update follower counts
-                user_to_follow.profile.follower_count = F('follower_count') - 1
-                user_to_follow.profile.save()
-                request.user.profile.following_count = F('following_count') - 1
-                request.user.profile.save()
-                
-                return Response({'status': 'unfollowed'}, status=status.HTTP_200_OK)
-            
-            return Response(
-                {'error': 'Not following this user'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        if unfollow_user(request.user, user_to_follow):
+            return Response({'status': 'unfollowed'}, status=status.HTTP_200_OK)
+        return Response(
+            {'error': 'Not following this user'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     @action(detail=True, methods=['get'])
     def followers(self, request, pk=None):
         """Get user's followers."""
         user = self.get_object()
-        followers = Follow.objects.filter(following=user).select_related('follower__profile')
-        serializer = FollowSerializer(followers, many=True, context={'request': request})
-        return Response(serializer.data)
+        followers = Follow.objects.filter(following=user).select_related(
+            'follower__profile', 'following__profile'
+        )
+        page = self.paginate_queryset(followers)
+        serializer = FollowSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['get'])
     def following(self, request, pk=None):
         """Get users that this user is following."""
         user = self.get_object()
-        following = Follow.objects.filter(follower=user).select_related('following__profile')
-        serializer = FollowSerializer(following, many=True, context={'request': request})
-        return Response(serializer.data)
+        following = Follow.objects.filter(follower=user).select_related(
+            'follower__profile', 'following__profile'
+        )
+        page = self.paginate_queryset(following)
+        serializer = FollowSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def suggestions(self, request):
+        """Get precomputed who-to-follow suggestions for the current user."""
+        ranked = get_follow_suggestions(request.user)
+        users = User.objects.select_related('profile').in_bulk([user_id for user_id, _ in ranked])
+        context = self.get_serializer_context()
+        # Drop users followed since the suggestions were computed
+        following = prime_following_cache(context, users.values())
+        results = [
+            {'user': UserSerializer(users[user_id], context=context).data, 'score': score}
+            for user_id, score in ranked
+            if user_id in users and not following[user_id]
+        ]
+        return Response(results)
     
     @action(detail=False, methods=['get', 'put'], permission_classes=[permissions.IsAuthenticated])
     def profile(self, request):
@@ -107,9 +107,33 @@ CORS_ALLOWED_ORIGINS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are hashed while streaming in so identical images are stored once
+FILE_UPLOAD_HANDLERS = [
+    'blog.utils.media.HashingMemoryFileUploadHandler',
+    'blog.utils.media.HashingTemporaryFileUploadHandler',
+]
+
+# Threads generating the renditions of newly saved images
+RENDITION_WORKERS = 2
+# Browser/CDN lifetime of on-demand renditions (their content never changes)
+RENDITION_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Threads running post-commit work such as feed fan-out (0 runs it inline)
+BACKGROUND_WORKERS = 2
+
+# Home feed: posts are fanned out to followers' timelines in the
+# background, except for authors with more followers than the limit, whose
+# posts are merged in when the feed is read
+FEED_FANOUT_MAX_FOLLOWERS = 5000
+FEED_BACKFILL_LIMIT = 50
+
+# Content neighbours kept per post by compute_related_posts and refreshed
+# in the background whenever a post is saved
+RELATED_POSTS_TOP_K = 10
+
 # DRF Configuration
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'blog.utils.pagination.BlogPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -117,6 +141,19 @@ REST_FRAMEWORK = {
     ],
 }
 
+# View counts are buffered in memory and flushed in batches
+VIEW_COUNT_FLUSH_INTERVAL = 10  # seconds
+VIEW_COUNT_FLUSH_THRESHOLD = 100  # buffered views
+
+# Anonymous post list/detail response cache. BACKEND may be
+# blog.utils.cache.LocMemResponseCache, FileResponseCache or DjangoResponseCache.
+# FileResponseCache needs OPTIONS {'location': <directory private to the site user>}.
+POST_RESPONSE_CACHE = {
+    'BACKEND': 'blog.utils.cache.LocMemResponseCache',
+    'TIMEOUT': 60,  # seconds
+    'OPTIONS': {'max_entries': 1000},
+}
+
 # JWT Configuration
 
 SIMPLE_JWT = {
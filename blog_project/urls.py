@@ -4,11 +4,13 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from blog.views.media import rendition
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('blog.urls')),
     path('api/auth/', include('allauth.urls')),
+    path(f"{settings.MEDIA_URL.lstrip('/')}r/<str:spec>/<path:path>", rendition, name='rendition'),
 ]
 
 # Serve media files in development